@@ -0,0 +1,144 @@
+"""
+Streaming corpus analyzer: tags every Arabic token of a text file (or stdin)
+with its candidate (root, scheme) pairs and writes one JSON line per token,
+in input order. Offsets are character positions in the decoded input.
+
+    python analyze_corpus.py corpus.txt -o tags.jsonl --workers 4
+"""
+import argparse
+import collections
+import json
+import multiprocessing
+import re
+import sys
+import time
+
+from logic_bst import ArabicBST
+from logic_engine import MorphEngine
+from logic_snapshot import load_snapshot
+from main import load_lexicon
+
+# Arabic letters plus tashkeel and tatweel
+TOKEN_RE = re.compile(r'[\u0621-\u064A\u0640\u064B-\u0652]+')
+
+# Per-worker state, set once by _init_worker
+_bst = None
+_schemes = None
+_memo = {}
+_MEMO_LIMIT = 50000
+
+
+def read_chunks(stream, chunk_chars):
+    """
+    Yield (offset, text) chunks that never split a token: the tail after the
+    last token boundary is carried into the next chunk.
+    """
+    offset, carry = 0, ''
+    while True:
+        block = stream.read(chunk_chars)
+        if not block:
+            if carry:
+                yield offset, carry
+            return
+        text = carry + block
+        cut = len(text)
+        while cut > 0 and TOKEN_RE.match(text[cut - 1]):
+            cut -= 1
+        if cut == 0:
+            carry = text  # one token longer than a chunk: keep reading
+            continue
+        yield offset, text[:cut]
+        offset += cut
+        carry = text[cut:]
+
+
+def tokenize(offset, text):
+    return [(m.group(), offset + m.start(), offset + m.end()) for m in TOKEN_RE.finditer(text)]
+
+
+def _init_worker(roots, schemes):
+    global _bst, _schemes
+    _bst = ArabicBST.from_sorted(roots)
+    _schemes = schemes
+
+
+def analyze_tokens(tokens):
+    """Worker task: JSON lines for one chunk of (token, start, end)."""
+    lines = []
+    for token, start, end in tokens:
+        analyses = _memo.get(token)
+        if analyses is None:
+            if len(_memo) >= _MEMO_LIMIT:
+                _memo.clear()
+            analyses = _memo[token] = [
+                {"root": root, "scheme": s['name']}
+                for root, s in MorphEngine.analyze(token, _schemes, _bst)
+            ]
+        lines.append(json.dumps({"token": token, "start": start, "end": end, "analyses": analyses},
+                                ensure_ascii=False))
+    return lines
+
+
+def run(source, out, roots, schemes, workers, chunk_chars, max_pending):
+    """Stream `source` through the analyzer; returns the number of tokens tagged."""
+    count = 0
+    chunks = (tokenize(offset, text) for offset, text in read_chunks(source, chunk_chars))
+
+    if workers == 0:
+        _init_worker(roots, schemes)
+        for tokens in chunks:
+            out.write(''.join(line + '\n' for line in analyze_tokens(tokens)))
+            count += len(tokens)
+        return count
+
+    # Ordered, bounded pipeline: at most max_pending chunks in flight, written in input order
+    pending = collections.deque()
+    with multiprocessing.Pool(workers, _init_worker, (roots, schemes)) as pool:
+        for tokens in chunks:
+            if len(pending) >= max_pending:
+                out.write(''.join(line + '\n' for line in pending.popleft().get()))
+            pending.append(pool.apply_async(analyze_tokens, (tokens,)))
+            count += len(tokens)
+        while pending:
+            out.write(''.join(line + '\n' for line in pending.popleft().get()))
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tag an Arabic corpus with (root, scheme) analyses as JSONL.")
+    parser.add_argument('input', nargs='?', default='-', help="text file to analyze ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL output file ('-' for stdout)")
+    parser.add_argument('--roots', default='racines.txt', help="roots file, one root per line")
+    parser.add_argument('--snapshot', help="load roots and schemes from a lexicon snapshot instead")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help="worker processes (0 analyzes in-process)")
+    parser.add_argument('--chunk-chars', type=int, default=64 * 1024, help="characters read per chunk")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="chunks in flight at once (default: 2 per worker)")
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        bst, ht = load_snapshot(args.snapshot)
+    else:
+        bst, ht = load_lexicon(args.roots)
+    roots = list(bst.roots())
+    schemes = ht.get_all()
+    max_pending = args.max_pending or max(2 * args.workers, 1)
+
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    started = time.perf_counter()
+    try:
+        count = run(source, out, roots, schemes, args.workers, args.chunk_chars, max_pending)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"{count} tokens in {elapsed:.2f}s ({rate:,.0f} tokens/sec)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
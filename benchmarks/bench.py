@@ -0,0 +1,331 @@
+"""
+Reproducible benchmarks for the morphology engine.
+
+Builds synthetic lexicons of trilateral roots covering every weakness class
+handled by the irregularity rules, times the core operations separately and
+reports ops/sec (median of several runs) plus peak traced memory. Each op
+also gets a `relative` score, its speed against a fixed pure-Python
+workload timed alongside it, which does not move when the whole machine
+is slower. Results are written as JSON and compared against a stored
+baseline on that score: any operation slower than the baseline by more
+than the tolerance fails the run.
+Operations under 10 microseconds jitter more and get --fast-tolerance.
+The baseline records the machine and Python it was measured on; against
+a different one the comparison is only a warning.
+
+    python benchmarks/bench.py                       # 1k, 10k, 100k
+    python benchmarks/bench.py --sizes 1000 --update-baseline
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'public'))
+
+from logic_bst import ArabicBST  # noqa: E402
+from logic_hash import SchemeHashTable  # noqa: E402
+from logic_engine import MorphEngine, classify_root  # noqa: E402
+
+try:
+    from logic_vector import VectorEngine  # noqa: E402
+except ImportError:  # NumPy not installed: the vector op is skipped
+    VectorEngine = None
+
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+
+# Baseline ops/sec above this (under 10us per op) use the fast tolerance
+FAST_OPS_PER_SEC = 100000
+
+SCHEMES = [
+    ("اسم فاعل", "فَاعِل"),
+    ("اسم مفعول", "مَفْعُول"),
+    ("المصدر", "اِفْتِعَال"),
+    ("الماضي", "فَعَلَ"),
+    ("المضارع", "يَفْعَلُ"),
+    ("اسم المكان", "مَفْعَل"),
+    ("الطلب", "اِسْتِفْعَال"),
+]
+
+# Arabic letters plus extended-Arabic ones (U+0679..U+069F): the 28 base
+# letters alone give only ~22k distinct roots, not enough for 100k
+STRONG = list('بتثجحخدذرزسشصضطظعغفقكلمنه') + [chr(c) for c in range(0x0679, 0x06A0)]
+WEAK = ['و', 'ي']
+HAMZAS = ['ء', 'أ', 'إ', 'ؤ', 'ئ']
+
+# Letter pools per radical position, one entry per weakness class
+CLASS_TEMPLATES = {
+    'regular': (STRONG, STRONG, STRONG),
+    'redoubled': (STRONG, STRONG, None),
+    'hollow': (STRONG, WEAK, STRONG),
+    'hamza_1': (HAMZAS, STRONG, STRONG),
+    'hamza_2': (STRONG, HAMZAS, STRONG),
+    'hamza_3': (STRONG, STRONG, HAMZAS),
+    'assimilated': (WEAK, STRONG, STRONG),
+    'defective': (STRONG, STRONG, WEAK),
+}
+
+
+def synthetic_roots(n, seed=0):
+    """`n` distinct roots: a fixed share of every weakness class, then regular roots."""
+    rng = random.Random(seed)
+    roots = []
+    seen = set()
+    share = max(n // 20, 1)
+    for name, (p1, p2, p3) in CLASS_TEMPLATES.items():
+        if name == 'regular':
+            continue
+        pool = [c1 + c2 + (c3 or c2) for c1 in p1 for c2 in p2 for c3 in (p3 or [None])]
+        rng.shuffle(pool)
+        for root in pool[:share]:
+            if root not in seen:
+                seen.add(root)
+                roots.append(root)
+    regular = list(itertools.product(STRONG, STRONG, STRONG))
+    rng.shuffle(regular)
+    for letters in regular:
+        if len(roots) >= n:
+            break
+        root = ''.join(letters)
+        if root not in seen:
+            seen.add(root)
+            roots.append(root)
+    rng.shuffle(roots)
+    return roots[:n]
+
+
+def reference_work():
+    """Fixed pure-Python workload timed next to every op, as a yardstick for machine speed."""
+    table = {}
+    for i in range(20000):
+        table[i & 1023] = str(i)
+
+
+def measure(fn, ops, repeat=9):
+    """
+    (ops/sec, relative) over `repeat` calls of `fn`, which performs `ops`
+    operations per call. Both are medians; `relative` is ops per run of
+    reference_work timed right after each call, so a machine that is
+    slower for the whole benchmark (shared CI runner, throttling) moves
+    ops/sec but not `relative`.
+    """
+    timings, relative = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        reference_work()
+        reference = time.perf_counter() - started
+        timings.append(elapsed)
+        relative.append(ops * reference / elapsed if elapsed > 0 else float('inf'))
+    median = statistics.median(timings)
+    return (ops / median if median > 0 else float('inf')), statistics.median(relative)
+
+
+def peak_memory(fn):
+    """Peak traced allocation (bytes) while running `fn` once."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_size(n, samples, seed, repeat=9):
+    rng = random.Random(seed)
+    roots = synthetic_roots(n, seed)
+    probes = [rng.choice(roots) for _ in range(samples)]
+    schemes = SchemeHashTable()
+    for name, pattern in SCHEMES:
+        schemes.insert(name, pattern)
+    all_schemes = schemes.get_all()
+    patterns = [pattern for _, pattern in SCHEMES]
+    names = [name for name, _ in SCHEMES]
+
+    def build():
+        bst = ArabicBST()
+        for root in roots:
+            bst.insert(root)
+        return bst
+
+    bst = build()
+    words = [(MorphEngine.apply_scheme(r, rng.choice(patterns), rng.random() < 0.3), r) for r in probes]
+
+    def generate():
+        for root in probes:
+            for pattern in patterns:
+                MorphEngine.apply_scheme(root, pattern)
+
+    # validate caches matches in the tree, so repeats measure the warm path
+    target = ArabicBST.from_sorted(sorted(roots))
+
+    def validate():
+        for word, root in words:
+            MorphEngine.validate(word, root, schemes, target)
+
+    ops = {
+        "bst.insert": (build, n),
+        "bst.search": (lambda: [bst.search(r) for r in probes], samples),
+        "bst.to_dict": (bst.to_dict, 1),
+        "ht.get": (lambda: [schemes.get(names[i % len(names)]) for i in range(samples)], samples),
+        "ht.get_all": (lambda: [schemes.get_all() for _ in range(samples)], samples),
+        "engine.apply_scheme": (generate, samples * len(patterns)),
+        "engine.validate": (validate, samples),
+    }
+    if VectorEngine is not None:
+        # Whole root x scheme block: every root, every scheme, both states
+        vector = VectorEngine(roots)
+        ops["vector.paradigm"] = (lambda: vector.paradigm(all_schemes), len(roots) * len(patterns) * 2)
+
+    results = {}
+    cache_size = MorphEngine.derivations.maxsize
+    for op, (fn, count) in ops.items():
+        if op.startswith('engine.'):
+            # Measure generation itself, not the derivation memo
+            MorphEngine.configure_cache(0)
+        ops_per_sec, relative = measure(fn, count, repeat)
+        results[op] = {
+            "ops_per_sec": round(ops_per_sec, 1),
+            "relative": round(relative, 3),
+            "peak_bytes": peak_memory(fn),
+        }
+        MorphEngine.configure_cache(cache_size)
+
+    classes = {}
+    for root in roots:
+        for cls in classify_root(root) or ('regular',):
+            classes[cls] = classes.get(cls, 0) + 1
+    return {"roots": len(roots), "classes": classes, "operations": results}
+
+
+def cpu_model():
+    """CPU model name (from /proc/cpuinfo on Linux), else whatever platform reports."""
+    try:
+        with open('/proc/cpuinfo', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.partition(':')[2].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def environment():
+    """What a baseline is only valid for."""
+    return {"python": platform.python_version(), "machine": platform.machine(), "cpu": cpu_model()}
+
+
+def load_baseline(path):
+    """(environment or None for an old flat baseline, {size: {op: stats or ops/sec}})."""
+    with open(path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if "results" not in baseline:
+        return None, baseline
+    return {key: baseline.get(key) for key in environment()}, baseline["results"]
+
+
+def compare(results, baseline, tolerance, fast_tolerance=None):
+    """
+    Regression messages for every op slower than baseline * (1 - tolerance).
+    Ops are compared on their `relative` score when the baseline has one,
+    on raw ops/sec for an old baseline that only stored that.
+    """
+    failures = []
+    for size, run in results.items():
+        for op, stats in run["operations"].items():
+            reference = baseline.get(size, {}).get(op)
+            if reference is None:
+                continue
+            if not isinstance(reference, dict):
+                reference = {"ops_per_sec": reference}
+            allowed = tolerance
+            if fast_tolerance is not None and reference["ops_per_sec"] > FAST_OPS_PER_SEC:
+                allowed = max(tolerance, fast_tolerance)
+            key = "relative" if "relative" in reference else "ops_per_sec"
+            floor = reference[key] * (1 - allowed)
+            if stats[key] < floor:
+                failures.append(f"{size} {op}: {key} {stats[key]:,.1f} < {floor:,.1f} "
+                                f"(baseline {reference[key]:,.1f}; {stats['ops_per_sec']:,.0f} ops/s now, "
+                                f"{reference['ops_per_sec']:,.0f} then)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark generation, validation and tree operations.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--samples', type=int, default=2000, help="probe operations per timed op")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='bench_results.json', help="results JSON file")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--repeat', type=int, default=9, help="timed runs per op (the median is kept)")
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help="allowed slowdown vs baseline before failing (0.3 = 30%%)")
+    parser.add_argument('--fast-tolerance', type=float, default=0.5,
+                        help="allowed slowdown for ops under 10us each, which jitter more")
+    parser.add_argument('--update-baseline', action='store_true', help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for n in args.sizes:
+        results[str(n)] = run_size(n, args.samples, args.seed, args.repeat)
+        for op, stats in results[str(n)]["operations"].items():
+            print(f"{n:>7} {op:<22} {stats['ops_per_sec']:>14,.0f} ops/s  "
+                  f"relative {stats['relative']:>12,.1f}  peak {stats['peak_bytes'] / 1024:>10,.0f} KiB")
+
+    report = {
+        **environment(),
+        "repeat": args.repeat,
+        "samples": args.samples,
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    stored_env, stored = None, {}
+    if os.path.exists(args.baseline):
+        stored_env, stored = load_baseline(args.baseline)
+    same_machine = stored_env == environment()
+
+    if args.update_baseline:
+        # Numbers from another machine are not comparable: start over
+        baseline = dict(stored) if same_machine else {}
+        for size, run in results.items():
+            baseline[size] = {op: {"ops_per_sec": stats["ops_per_sec"], "relative": stats["relative"]}
+                              for op, stats in run["operations"].items()}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({**environment(), "results": baseline}, f, indent=2, sort_keys=True)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not stored:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+    failures = compare(results, stored, args.tolerance, args.fast_tolerance)
+    if not same_machine:
+        print(f"WARNING baseline was measured on {stored_env or 'an unrecorded machine'}, "
+              f"this run is {environment()}: not gating; run with --update-baseline here.", file=sys.stderr)
+        for failure in failures:
+            print(f"slower {failure}", file=sys.stderr)
+        return 0
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    if failures:
+        print(f"{len(failures)} operation(s) regressed beyond {args.tolerance:.0%} "
+              f"({args.fast_tolerance:.0%} for ops under 10us)", file=sys.stderr)
+        return 1
+    print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Golden-set check for word generation.
+
+golden.tsv.gz holds apply_scheme output for every root over a 20-letter
+alphabet (strong, weak, hamza and alef letters: 8000 roots, each weakness
+class and combination) times 9 patterns, indefinite and definite. This
+script compares the scalar engine with it and, with NumPy available,
+runs VectorEngine.verify over the same roots and patterns. It then
+validates a few words known to have broken validation before, on every
+validate path and through validate_many. Any mismatch fails the run.
+
+    python benchmarks/check_golden.py
+"""
+import argparse
+import gzip
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'public'))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from logic_bst import ArabicBST  # noqa: E402
+from logic_engine import MorphEngine, ParadigmIndex  # noqa: E402
+from logic_hash import SchemeHashTable  # noqa: E402
+from main import INITIAL_SCHEMES  # noqa: E402
+
+try:
+    from logic_vector import VectorEngine  # noqa: E402
+except ImportError:  # NumPy missing or too old: only the scalar engine is checked
+    VectorEngine = None
+
+GOLDEN_PATH = os.path.join(HERE, 'golden.tsv.gz')
+
+# (word, root, expected scheme name): indefinite اِفْتِعَال forms of roots
+# starting with ل normalize to a string starting with ال, like definite ones
+VALIDATE_CASES = [
+    ("اِلْتِعَاب", "لعب", "المصدر"),
+    ("اِلْتِمَاس", "لمس", "المصدر"),
+    ("التعاب", "لعب", "المصدر"),
+    ("الاِلْتِعَاب", "لعب", "المصدر"),
+    ("كَاتِب", "كتب", "اسم فاعل"),
+    ("الكَاتِب", "كتب", "اسم فاعل"),
+]
+
+
+def load_golden(path=GOLDEN_PATH):
+    """(columns as (pattern, is_definite), {root: expected words in column order})."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = f.readline().rstrip('\n').split('\t')[1:]
+        columns = [(pattern, definite == '1')
+                   for pattern, definite in (column.rsplit(':', 1) for column in header)]
+        expected = {}
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            expected[fields[0]] = fields[1:]
+    return columns, expected
+
+
+def check_validate(cases=VALIDATE_CASES):
+    """(path, word, root, expected, got) for every case a validate path gets wrong."""
+    ht = SchemeHashTable()
+    for name, pattern in INITIAL_SCHEMES:
+        ht.insert(name, pattern)
+    roots = sorted({root for _, root, _ in cases})
+    bst = ArabicBST.from_sorted(roots)
+    paradigms = ParadigmIndex().attach(ArabicBST.from_sorted(roots), ht)
+    # The second validate on `bst` answers from the words the first one cached
+    paths = {
+        "full": lambda word, root: MorphEngine.validate(word, root, ht, ArabicBST.from_sorted(roots)),
+        "cache": lambda word, root: MorphEngine.validate(word, root, ht, bst)
+        and MorphEngine.validate(word, root, ht, bst),
+        "paradigm": lambda word, root: MorphEngine.validate(word, root, ht, bst, paradigms),
+        "schemes list": lambda word, root: MorphEngine.validate(word, root, ht.get_all(),
+                                                                ArabicBST.from_sorted(roots)),
+    }
+    mismatches = []
+    for path, validate in paths.items():
+        for word, root, expected in cases:
+            _, scheme = validate(word, root)
+            got = scheme and scheme['name']
+            if got != expected:
+                mismatches.append((path, word, root, expected, got))
+    # Batched validation (serve.py /validate), one call for every case
+    batch = MorphEngine.validate_many([(word, root) for word, root, _ in cases], ht,
+                                      ArabicBST.from_sorted(roots))
+    for (word, root, expected), (_, scheme) in zip(cases, batch):
+        got = scheme and scheme['name']
+        if got != expected:
+            mismatches.append(("batch", word, root, expected, got))
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check scalar and vector generation against the golden set.")
+    parser.add_argument('--golden', default=GOLDEN_PATH)
+    parser.add_argument('--show', type=int, default=10, help="mismatches printed per engine")
+    args = parser.parse_args(argv)
+
+    columns, expected = load_golden(args.golden)
+    failures = 0
+
+    # Generation itself, not the derivation memo
+    MorphEngine.configure_cache(0)
+    scalar = []
+    for root, words in expected.items():
+        for (pattern, is_def), word in zip(columns, words):
+            generated = MorphEngine.apply_scheme(root, pattern, is_def)
+            if generated != word:
+                scalar.append((root, pattern, is_def, generated, word))
+    total = len(expected) * len(columns)
+    print(f"scalar: {len(scalar)} mismatches of {total}")
+    for mismatch in scalar[:args.show]:
+        print("  ", *mismatch)
+    failures += len(scalar)
+
+    if VectorEngine is None:
+        print("vector: skipped (NumPy >= 2.3 not available)")
+    else:
+        patterns = list(dict.fromkeys(pattern for pattern, _ in columns))
+        schemes = [{"name": pattern, "pattern": pattern} for pattern in patterns]
+        vector = VectorEngine(list(expected)).verify(schemes)
+        print(f"vector: {len(vector)} mismatches of {total}")
+        for mismatch in vector[:args.show]:
+            print("  ", *mismatch)
+        failures += len(vector)
+
+    validation = check_validate()
+    print(f"validate: {len(validation)} mismatches of {len(VALIDATE_CASES)} words")
+    for mismatch in validation[:args.show]:
+        print("  ", *mismatch)
+    failures += len(validation)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Bulk lexicon ingestion: streams a derives.txt-style file (comma-separated
+derived words, one group per line), attributes every word to the
+(root, scheme) pairs that generate it among the loaded roots and schemes,
+and merges them into the lexicon in root-sorted batches. The result is
+saved as a snapshot; words no root/scheme pair generates are written to a
+separate file as "line<TAB>word".
+
+With --root-first, the first field of each line is a root (the web UI's
+"root, words..." form) and that line's words are only attributed to it.
+
+Attribution probes a materialized paradigm (every root x scheme form,
+see ParadigmIndex) when it fits in --paradigm-cells cells per worker,
+and falls back to root-less analysis (MorphEngine.analyze) above that.
+
+    python ingest_derives.py public/derives.txt -o lexicon.snap --workers 4
+"""
+import argparse
+import collections
+import itertools
+import multiprocessing
+import sys
+import time
+
+from logic_bst import ArabicBST
+from logic_engine import MorphEngine, ParadigmIndex
+from logic_normalize import normalize_many
+from logic_snapshot import load_snapshot, save_snapshot
+from main import load_lexicon
+
+# Per-worker state, set once by _init_worker
+_bst = None
+_schemes = None
+_paradigms = None
+_memo = {}
+_MEMO_LIMIT = 50000
+
+
+def read_words(stream, root_first=False):
+    """Yield (line number, root hint or None, word) for every field of every line."""
+    for number, line in enumerate(stream, 1):
+        fields = [field.strip() for field in line.split(',')]
+        fields = [field for field in fields if field]
+        hint = fields.pop(0) if root_first and fields else None
+        for word in fields:
+            yield number, hint, word
+
+
+def _init_worker(roots, schemes, use_paradigm):
+    global _bst, _schemes, _paradigms
+    _bst = ArabicBST.from_sorted(roots)
+    _schemes = schemes
+    _paradigms = None
+    if use_paradigm:
+        _paradigms = ParadigmIndex()
+        for s in schemes:
+            _paradigms.add_scheme(s['name'], s['pattern'])
+        _paradigms.add_roots(roots)
+
+
+def _analyses(word, normalized):
+    """Distinct (root, scheme name) pairs generating `word`, in discovery order."""
+    if _paradigms is not None:
+        pairs = ((root, name) for root, name, _ in _paradigms.lookup(word, normalized))
+    else:
+        pairs = ((root, s['name']) for root, s in MorphEngine.analyze(word, _schemes, _bst, normalized))
+    return list(dict.fromkeys(pairs))
+
+
+def attribute_words(items):
+    """
+    Worker task: (line, word, normalized form, [(root, scheme name)]) for one
+    batch of read_words items. Each word is normalized once, here; the
+    paradigm probe and the parent's index inserts reuse that form.
+    """
+    results = []
+    forms = normalize_many([word for _, _, word in items])
+    for (number, hint, word), normalized in zip(items, forms):
+        analyses = _memo.get(word)
+        if analyses is None:
+            if len(_memo) >= _MEMO_LIMIT:
+                _memo.clear()
+            analyses = _memo[word] = _analyses(word, normalized)
+        if hint is not None:
+            analyses = [(root, name) for root, name in analyses if root == hint]
+        results.append((number, word, normalized, analyses))
+    return results
+
+
+def merge_batch(bst, results, unattributed, counts):
+    """Group a batch's attributions by root and insert each root once, in sorted order."""
+    by_root = collections.defaultdict(list)
+    for number, word, normalized, analyses in results:
+        counts["words"] += 1
+        if not analyses:
+            counts["unattributed"] += 1
+            unattributed.write(f"{number}\t{word}\n")
+            continue
+        counts["attributed"] += 1
+        if len(analyses) > 1:
+            counts["ambiguous"] += 1
+        for root, name in analyses:
+            by_root[root].append({"word": word, "pattern": name, "normalized": normalized})
+    bst.insert_batch(sorted(by_root.items()))
+
+
+def run(source, bst, schemes, unattributed, workers, batch_size, max_pending,
+        root_first=False, paradigm_cells=0):
+    """Stream `source` into `bst`; returns the counters."""
+    counts = collections.Counter()
+    roots = list(bst.roots())
+    use_paradigm = len(roots) * len(schemes) <= paradigm_cells
+    items = read_words(source, root_first)
+    batches = iter(lambda: list(itertools.islice(items, batch_size)), [])
+
+    if workers == 0:
+        _init_worker(roots, schemes, use_paradigm)
+        for batch in batches:
+            merge_batch(bst, attribute_words(batch), unattributed, counts)
+        return counts
+
+    # Bounded pipeline: at most max_pending batches in flight, merged in input order
+    pending = collections.deque()
+    with multiprocessing.Pool(workers, _init_worker, (roots, schemes, use_paradigm)) as pool:
+        for batch in batches:
+            if len(pending) >= max_pending:
+                merge_batch(bst, pending.popleft().get(), unattributed, counts)
+            pending.append(pool.apply_async(attribute_words, (batch,)))
+        while pending:
+            merge_batch(bst, pending.popleft().get(), unattributed, counts)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attribute derived words to roots and schemes and load them.")
+    parser.add_argument('input', nargs='?', default='-', help="derives file to ingest ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='lexicon.snap', help="snapshot to write")
+    parser.add_argument('--unattributed', default='unattributed.txt',
+                        help="file for words no root/scheme generates ('-' for stdout)")
+    parser.add_argument('--roots', default='racines.txt', help="roots file, one root per line")
+    parser.add_argument('--snapshot', help="start from a lexicon snapshot instead")
+    parser.add_argument('--root-first', action='store_true',
+                        help="the first field of each line is the root its words belong to")
+    parser.add_argument('--paradigm-cells', type=int, default=200000,
+                        help="largest roots x schemes paradigm to materialize per worker "
+                             "(about 1.2 KB per cell); larger lexicons use root-less analysis")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help="worker processes (0 attributes in-process)")
+    parser.add_argument('--batch-size', type=int, default=2000, help="words per batch")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="batches in flight at once (default: 2 per worker)")
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        bst, ht = load_snapshot(args.snapshot)
+    else:
+        bst, ht = load_lexicon(args.roots)
+    max_pending = args.max_pending or max(2 * args.workers, 1)
+
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    unattributed = sys.stdout if args.unattributed == '-' else open(args.unattributed, 'w', encoding='utf-8')
+    started = time.perf_counter()
+    try:
+        counts = run(source, bst, ht.get_all(), unattributed, args.workers, args.batch_size, max_pending,
+                     args.root_first, args.paradigm_cells)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if unattributed is not sys.stdout:
+            unattributed.close()
+    save_snapshot(args.output, bst, ht)
+    elapsed = time.perf_counter() - started
+    rate = counts["words"] / elapsed if elapsed > 0 else 0.0
+    print(f"{counts['words']} words in {elapsed:.2f}s ({rate:,.0f} words/sec): "
+          f"{counts['attributed']} attributed ({counts['ambiguous']} ambiguous), "
+          f"{counts['unattributed']} unattributed -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
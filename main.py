@@ -4,7 +4,8 @@ import sys
 import json
 from logic_bst import ArabicBST
 from logic_hash import SchemeHashTable
-from logic_engine import MorphEngine
+from logic_engine import MorphEngine, ParadigmIndex, metrics_snapshot
+from logic_snapshot import load_snapshot, save_snapshot
 
 # Force UTF-8 encoding for standard output to support Arabic Shakl in all terminals
 if sys.platform == "win32":
@@ -20,42 +21,64 @@ def print_header():
     print("\033[1;36m" + "=" * 60 + "\033[0m")
 
 def print_tree(node, prefix="", is_left=True):
-    """Recursively prints the BST in a text-based format."""
-    if node is not None:
-        print_tree(node.right, prefix + ("│   " if is_left else "    "), False)
-        print(prefix + ("└── " if is_left else "┌── ") + "\033[1;32m" + str(node.root) + "\033[0m")
-        print_tree(node.left, prefix + ("    " if is_left else "│   "), True)
+    """Prints the BST in a text-based format (explicit stack, no recursion)."""
+    stack = [(node, prefix, is_left, False)] if node is not None else []
+    while stack:
+        current, pre, left_side, expanded = stack.pop()
+        if expanded:
+            print(pre + ("└── " if left_side else "┌── ") + "\033[1;32m" + str(current.root) + "\033[0m")
+            continue
+        if current.left:
+            stack.append((current.left, pre + ("    " if left_side else "│   "), True, False))
+        stack.append((current, pre, left_side, True))
+        if current.right:
+            stack.append((current.right, pre + ("│   " if left_side else "    "), False, False))
+
+# Session snapshot: roots, derivatives and schemes saved on exit
+SNAPSHOT_PATH = 'lexicon.snap'
+
+# Vocalized Schemes (الأوزان المشكولة)
+INITIAL_SCHEMES = [
+    ("اسم فاعل", "فَاعِل"), 
+    ("اسم مفعول", "مَفْعُول"), 
+    ("المصدر", "اِفْتِعَال"), 
+    ("الماضي", "فَعَلَ"),
+    ("المضارع", "يَفْعَلُ"),
+    ("اسم المكان", "مَفْعَل"), 
+    ("الطلب", "اِسْتِفْعَال")
+]
+
+# Fallback if racines.txt is missing
+DEFAULT_ROOTS = ["كتب", "درس", "عمل", "قول", "ردد", "رمي", "أكل"]
+
+def load_lexicon(roots_path='racines.txt'):
+    """Build the root tree (sorted bulk build, no per-root AVL inserts) and the scheme table."""
+    try:
+        with open(roots_path, 'r', encoding='utf-8') as f:
+            roots = [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        roots = DEFAULT_ROOTS
+    bst = ArabicBST.bulk_load(roots)
+
+    ht = SchemeHashTable()
+    for name, patt in INITIAL_SCHEMES:
+        ht.insert(name, patt)
+    return bst, ht
 
 def main():
     # 1. Initialize Logic
-    bst = ArabicBST()
-    ht = SchemeHashTable()
     engine = MorphEngine()
 
-    # 2. Load Initial Roots
-    try:
-        with open('racines.txt', 'r', encoding='utf-8') as f:
-            roots = [line.strip() for line in f if line.strip()]
-            for r in roots:
-                bst.insert(r)
-    except FileNotFoundError:
-        # Fallback if file is missing
-        default_roots = ["كتب", "درس", "عمل", "قول", "ردد", "رمي", "أكل"]
-        for r in default_roots:
-            bst.insert(r)
-
-    # 3. Load Vocalized Schemes (الأوزان المشكولة)
-    initial_schemes = [
-        ("اسم فاعل", "فَاعِل"), 
-        ("اسم مفعول", "مَفْعُول"), 
-        ("المصدر", "اِفْتِعَال"), 
-        ("الماضي", "فَعَلَ"),
-        ("المضارع", "يَفْعَلُ"),
-        ("اسم المكان", "مَفْعَل"), 
-        ("الطلب", "اِسْتِفْعَال")
-    ]
-    for name, patt in initial_schemes:
-        ht.insert(name, patt)
+    # 2-3. Restore the last session, or load roots and schemes from scratch
+    if os.path.exists(SNAPSHOT_PATH):
+        bst, ht = load_snapshot(SNAPSHOT_PATH)
+    else:
+        bst, ht = load_lexicon()
+
+    # 4. Materialized paradigm index (kept in sync with bst / ht from now on)
+    paradigms = ParadigmIndex().attach(bst, ht)
+    # Derivation memo drops a pattern's entries when that scheme is edited
+    engine.derivations.attach(ht)
 
     while True:
         clear_screen()
@@ -64,7 +87,8 @@ def main():
         print("\033[1m[2]\033[0m توليد اشتقاق جديد (Derivation Generator)")
         print("\033[1m[3]\033[0m تحليل كلمة (Morphological Validator)")
         print("\033[1m[4]\033[0m إضافة جذر جديد (Add Root)")
-        print("\033[1m[5]\033[0m خروج (Exit)")
+        print("\033[1m[5]\033[0m مؤشرات الأداء (Metrics)")
+        print("\033[1m[6]\033[0m خروج (Exit)")
         
         choice = input("\n\033[1;35mاختر الخيار المناسب: \033[0m").strip()
 
@@ -81,16 +105,15 @@ def main():
         elif choice == '2':
             clear_screen()
             print_header()
-            roots_list = []
-            def collect(n):
-                if n:
-                    collect(n.left)
-                    roots_list.append(n.root)
-                    collect(n.right)
-            collect(bst.root_node)
+            prefix = input("\033[1;34mبداية الجذر لتصفية القائمة (اتركه فارغاً للكل): \033[0m").strip()
+            roots_list = list(bst.roots_with_prefix(prefix))
 
             print("\n\033[1mالجذور المتوفرة:\033[0m", " | ".join(roots_list))
             root = input("\033[1;34mأدخل الجذر (مثلاً: كتب): \033[0m").strip()
+            if root and bst.search(root) is None:
+                suggestions = [r for r, _ in bst.nearest_roots(root, 1)]
+                if suggestions:
+                    print("\033[1;33mجذر غير موجود، هل تقصد:\033[0m", " | ".join(suggestions))
             
             schemes = ht.get_all()
             print("\n\033[1mالأوزان المتوفرة:\033[0m")
@@ -107,7 +130,7 @@ def main():
                 print(f"الاشتقاق النهائي: \033[1;32m{result}\033[0m")
                 print(f"-"*30)
                 # Save to BST
-                bst.insert(root, [{"word": result, "pattern": pattern}])
+                bst.insert(root, [{"word": result, "pattern": pattern}], cached=True)
             except (ValueError, IndexError):
                 print("\n\033[1;31mخطأ: اختيار غير صحيح.\033[0m")
             input("\nاضغط Enter للعودة...")
@@ -117,14 +140,25 @@ def main():
             print_header()
             print("\n--- المحلل الصرفي الذكي ---")
             word = input("\033[1;34mأدخل الكلمة (مع التشكيل أو بدونه): \033[0m").strip()
-            root = input("\033[1;34mأدخل الجذر الثلاثي المتوقع: \033[0m").strip()
+            root = input("\033[1;34mأدخل الجذر الثلاثي المتوقع (أو اتركه فارغاً للتحليل التلقائي): \033[0m").strip()
+            
+            if not root:
+                analyses = engine.analyze(word, ht.get_all(), bst)
+                if analyses:
+                    print(f"\n\033[1;32m✅ التحليلات الممكنة:\033[0m")
+                    for r, scheme in analyses:
+                        print(f"الجذر: \033[1m{r}\033[0m — الوزن: \033[1m{scheme['name']}\033[0m (\033[1;36m{scheme['pattern']}\033[0m)")
+                else:
+                    print("\n\033[1;31m❌ لم يتم العثور على جذر معروف لهذه الكلمة.\033[0m")
+                input("\nاضغط Enter للعودة...")
+                continue
             
-            is_valid, scheme = engine.validate(word, root, ht.get_all())
+            is_valid, scheme = engine.validate(word, root, ht, bst, paradigms)
             
             if is_valid:
                 print(f"\n\033[1;32m✅ توافق صرفي ناجح!\033[0m")
                 print(f"الكلمة تتبع وزن: \033[1m{scheme['name']}\033[0m (\033[1;36m{scheme['pattern']}\033[0m)")
-                bst.insert(root, [{"word": word, "pattern": scheme['name']}])
+                bst.insert(root, [{"word": word, "pattern": scheme['name']}], cached=True)
             else:
                 print("\n\033[1;31m❌ لا يوجد توافق صرفي لهذه الكلمة مع هذا الجذر.\033[0m")
             input("\nاضغط Enter للعودة...")
@@ -139,6 +173,14 @@ def main():
             input("\nاضغط Enter للعودة...")
 
         elif choice == '5':
+            clear_screen()
+            print_header()
+            print("\n--- مؤشرات الأداء (JSON) ---\n")
+            print(metrics_snapshot(bst, ht))
+            input("\nاضغط Enter للعودة...")
+
+        elif choice == '6':
+            save_snapshot(SNAPSHOT_PATH, bst, ht)
             print("\nشكرًا لاستخدامك المُصَرِّف المَشْكُول. وداعاً!")
             break
 
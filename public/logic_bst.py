@@ -1,19 +1,632 @@
 import json
+from collections import OrderedDict
+
+from logic_dawg import DAWG
+from logic_metrics import Metrics, clock
+from logic_normalize import FOLD_HAMZA, MATCH, SEARCH, normalize
+from logic_symbols import SYMBOLS
+
+
+def normalize_word(word, fold_hamza=False):
+    """Index key for a word: tashkeel and tatweel removed, ى unified, hamza seats optionally folded."""
+    return normalize(word, SEARCH if fold_hamza else MATCH)
+
+
+def index_key(word, fold_hamza=False, normalized=None):
+    """normalize_word(), reusing the word's MATCH form when the caller already computed it."""
+    if normalized is None:
+        return normalize_word(word, fold_hamza)
+    return normalize(normalized, FOLD_HAMZA) if fold_hamza else normalized
+
+
+class InverseIndex:
+    """
+    Multi-valued reverse lookup word -> (root, scheme) entries.
+    Primary key is the normalized form, so undiacritized input hits;
+    the exact vocalized form is kept as a secondary key.
+
+    With a capacity, entries added with pinned=False (words cached by
+    validate or generation) are bounded: past `capacity` of them, the
+    least recently looked-up ones are evicted. Pinned entries (the
+    curated lexicon) are never evicted and do not count.
+
+    Each table is a private overlay over a base that copy() shares
+    between indexes and nobody modifies (an empty tuple in the overlay
+    hides a base key); the overlays are folded into a fresh base once
+    they outgrow a few times the square root of its size.
+    """
+    MIN_MERGE = 1024
+
+    def __init__(self, fold_hamza=False, capacity=None):
+        self.fold_hamza = fold_hamza
+        self.normalized = {}  # normalized form -> tuple of (root, scheme)
+        self.exact = {}       # vocalized form -> tuple of (root, scheme)
+        self._base_normalized = {}
+        self._base_exact = {}
+        self.forms = 0        # normalized forms with at least one entry
+        self.merges = 0
+        self.hits = 0
+        self.misses = 0
+        # Frozen: lookups no longer count hits or refresh recency (see ArabicBST.freeze)
+        self.frozen = False
+        self.capacity = capacity
+        self.cached = OrderedDict()  # (word, entry) -> normalized form, least recent first
+        self.cached_by_key = {}      # normalized form -> its (word, entry) keys in `cached`
+        # normalized form -> entries also backed by a pinned word, so
+        # evicting a cached spelling must leave the normalized entry in place
+        self.pinned = {}
+        self.evictions = 0
+        self.on_evict = None  # callback(root, word, scheme) for each evicted entry
+
+    @staticmethod
+    def _entries(table, base, key):
+        entries = table.get(key)
+        return base.get(key, ()) if entries is None else entries
+
+    def exact_entries(self, word):
+        """Entries recorded for this exact (vocalized) form."""
+        return self._entries(self.exact, self._base_exact, word)
+
+    def add(self, word, root_str, scheme=None, pinned=True, normalized=None):
+        """`normalized`: the word's MATCH form, if the caller has it (see index_key)."""
+        entry = (root_str, scheme)
+        norm = index_key(word, self.fold_hamza, normalized)
+        if self.capacity is not None:
+            key = (word, entry)
+            if pinned:
+                if key in self.cached:  # promoted: the lexicon now vouches for it
+                    self._uncache(key, norm)
+                if norm in self.cached_by_key:
+                    self.pinned.setdefault(norm, set()).add(entry)
+            elif key in self.cached:
+                self.cached.move_to_end(key)
+                return
+            elif entry not in self.exact_entries(word):
+                if entry in self._entries(self.normalized, self._base_normalized, norm) and \
+                        all(e != entry for _, e in self.cached_by_key.get(norm, ())):
+                    self.pinned.setdefault(norm, set()).add(entry)
+                self.cached[key] = norm
+                self.cached_by_key.setdefault(norm, set()).add(key)
+        for table, base, key in ((self.exact, self._base_exact, word),
+                                 (self.normalized, self._base_normalized, norm)):
+            entries = self._entries(table, base, key)
+            if entry not in entries:
+                if not entries and table is self.normalized:
+                    self.forms += 1
+                table[key] = entries + (entry,)
+        if self.capacity is not None:
+            while len(self.cached) > self.capacity:
+                self._evict()
+
+    def _uncache(self, key, norm):
+        del self.cached[key]
+        keys = self.cached_by_key[norm]
+        keys.discard(key)
+        if not keys:
+            del self.cached_by_key[norm]
+
+    def _evict(self):
+        """Drop the least recently used cached entry from both tables."""
+        (word, entry), norm = self.cached.popitem(last=False)
+        keys = self.cached_by_key[norm]
+        keys.discard((word, entry))
+        if not keys:
+            del self.cached_by_key[norm]
+        for table, base, key, keep in ((self.exact, self._base_exact, word, False),
+                                       (self.normalized, self._base_normalized, norm,
+                                        entry in self.pinned.get(norm, ())
+                                        or any(e == entry for _, e in keys))):
+            if keep:
+                continue
+            before = self._entries(table, base, key)
+            entries = tuple(e for e in before if e != entry)
+            if entries or key in base:
+                table[key] = entries
+            else:
+                table.pop(key, None)
+            if before and not entries and table is self.normalized:
+                self.forms -= 1
+        if norm not in self.cached_by_key:
+            self.pinned.pop(norm, None)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(entry[0], word, entry[1])
+
+    def resize(self, capacity):
+        """Change the capacity (None: unbounded), evicting down to it now."""
+        self.capacity = capacity
+        if capacity is not None:
+            while len(self.cached) > capacity:
+                self._evict()
+
+    def lookup(self, word, normalized=None):
+        """
+        Exact-form entries first, then the other entries sharing its normalized
+        form (`normalized`: the word's MATCH form, if the caller has it).
+        """
+        norm = index_key(word, self.fold_hamza, normalized)
+        exact = self.exact.get(word)
+        if exact is None:
+            exact = self._base_exact.get(word, ())
+        entries = self.normalized.get(norm)
+        if entries is None:
+            entries = self._base_normalized.get(norm, ())
+        if not self.frozen:
+            if entries:
+                self.hits += 1
+                if self.cached_by_key:
+                    for key in self.cached_by_key.get(norm, ()):
+                        self.cached.move_to_end(key)
+            else:
+                self.misses += 1
+        if not exact:
+            return list(entries)
+        return list(exact) + [e for e in entries if e not in exact]
+
+    @staticmethod
+    def _folded(table, base):
+        """An overlay applied to its base; the overlay itself when there is no base yet."""
+        if not base:
+            return table
+        merged = dict(base)
+        for key, entries in table.items():
+            if entries:
+                merged[key] = entries
+            else:
+                merged.pop(key, None)
+        return merged
+
+    def copy(self):
+        """
+        Independent index with the same forms: it shares the base and
+        copies the overlays (and the cached-entry bookkeeping, at most
+        `capacity` entries), so both can keep adding and evicting.
+        """
+        limit = max(self.MIN_MERGE, 8 * int(len(self._base_normalized) ** 0.5))
+        if len(self.normalized) + len(self.exact) > limit:
+            # Base first, then the emptied overlays: a concurrent lookup
+            # reading either overlay then the base sees the same entries
+            self._base_normalized = self._folded(self.normalized, self._base_normalized)
+            self._base_exact = self._folded(self.exact, self._base_exact)
+            self.normalized, self.exact = {}, {}
+            self.merges += 1
+        clone = InverseIndex(self.fold_hamza, self.capacity)
+        clone._base_normalized = self._base_normalized
+        clone._base_exact = self._base_exact
+        clone.normalized = self.normalized.copy()
+        clone.exact = self.exact.copy()
+        clone.forms = self.forms
+        clone.merges = self.merges
+        clone.cached = self.cached.copy()
+        clone.cached_by_key = {norm: set(keys) for norm, keys in self.cached_by_key.items()}
+        clone.pinned = {norm: set(entries) for norm, entries in self.pinned.items()}
+        clone.evictions = self.evictions
+        return clone
+
+    def __contains__(self, word):
+        norm = normalize_word(word, self.fold_hamza)
+        return bool(self._entries(self.normalized, self._base_normalized, norm))
+
+    def __len__(self):
+        return self.forms
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        resident = sum(len(entries) for entries in self.exact.values())
+        resident += sum(len(entries) for word, entries in self._base_exact.items() if word not in self.exact)
+        return {
+            "forms": self.forms,
+            "resident": resident,
+            "cached": len(self.cached),
+            "capacity": self.capacity,
+            "evictions": self.evictions,
+            "merges": self.merges,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CompactInverseIndex:
+    """
+    InverseIndex with the same interface, holding its forms in a DAWG:
+    shared prefixes (ال, م, اِسْتِ) and suffixes are stored once, in flat
+    arrays. New forms go to a pending dict; the next lookup merges it
+    into a rebuilt automaton once it outgrows a fraction of it, so bulk
+    adds pay for a single build.
+    """
+    # Key prefixes keeping vocalized and normalized forms apart in one automaton
+    _EXACT = '\x01'
+    _NORMALIZED = '\x02'
+    MIN_MERGE = 1024
+    MERGE_RATIO = 0.25
+
+    def __init__(self, fold_hamza=False, dawg=None):
+        self.fold_hamza = fold_hamza
+        self.dawg = dawg if dawg is not None else DAWG.build(())
+        self.pending = {}  # prefixed key -> tuple of (root, scheme), overrides the DAWG
+        self.normalized_count = self.dawg.count(self._NORMALIZED)
+        self.merges = 0
+        self.hits = 0
+        self.misses = 0
+        # Frozen: lookups neither merge pending forms nor count hits
+        self.frozen = False
+
+    def _get(self, key):
+        entries = self.pending.get(key)
+        return entries if entries is not None else self.dawg.get(key, ())
+
+    def add(self, word, root_str, scheme=None, pinned=True, normalized=None):
+        # No capacity here: every entry is kept, `pinned` is accepted for symmetry
+        entry = (root_str, scheme)
+        for key in (self._EXACT + word, self._NORMALIZED + index_key(word, self.fold_hamza, normalized)):
+            entries = self._get(key)
+            if entry not in entries:
+                if not entries and key[0] == self._NORMALIZED:
+                    self.normalized_count += 1
+                self.pending[key] = entries + (entry,)
+
+    def compact(self):
+        """Merge pending forms into a freshly minimized automaton."""
+        if not self.pending:
+            return
+        self.dawg = DAWG.build(self._merged())
+        self.pending = {}
+        self.merges += 1
+
+    def _merged(self):
+        """DAWG items and sorted pending items as one sorted stream; pending wins ties."""
+        pending = sorted(self.pending.items())
+        i = 0
+        for key, entries in self.dawg.items():
+            while i < len(pending) and pending[i][0] < key:
+                yield pending[i]
+                i += 1
+            if i < len(pending) and pending[i][0] == key:
+                continue
+            yield key, entries
+        yield from pending[i:]
+
+    def lookup(self, word, normalized=None):
+        """Exact-form entries first, then the other entries sharing its normalized form."""
+        if not self.frozen and len(self.pending) > max(self.MIN_MERGE, self.MERGE_RATIO * len(self.dawg)):
+            self.compact()
+        exact = self._get(self._EXACT + word)
+        entries = self._get(self._NORMALIZED + index_key(word, self.fold_hamza, normalized))
+        if not self.frozen:
+            if entries:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not exact:
+            return list(entries)
+        return list(exact) + [e for e in entries if e not in exact]
+
+    def forms_with_prefix(self, prefix):
+        """Lazy (normalized form, entries) pairs for forms starting with `prefix`."""
+        self.compact()
+        start = len(self._NORMALIZED)
+        for key, entries in self.dawg.items(self._NORMALIZED + normalize_word(prefix, self.fold_hamza)):
+            yield key[start:], entries
+
+    def to_bytes(self):
+        """The whole index as one flat buffer (see logic_dawg for the layout)."""
+        self.compact()
+        return self.dawg.to_bytes()
+
+    @classmethod
+    def from_bytes(cls, buffer, fold_hamza=False):
+        return cls(fold_hamza, DAWG.from_bytes(buffer))
+
+    def copy(self):
+        """Independent index sharing the (never modified) automaton."""
+        clone = CompactInverseIndex.__new__(CompactInverseIndex)
+        clone.fold_hamza = self.fold_hamza
+        clone.dawg = self.dawg
+        clone.pending = self.pending.copy()
+        clone.normalized_count = self.normalized_count
+        clone.merges = self.merges
+        clone.hits = clone.misses = 0
+        clone.frozen = False
+        return clone
+
+    def __contains__(self, word):
+        return bool(self._get(self._NORMALIZED + normalize_word(word, self.fold_hamza)))
+
+    def __len__(self):
+        return self.normalized_count
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "forms": self.normalized_count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "dawg_states": len(self.dawg.info),
+            "dawg_edges": len(self.dawg.labels),
+            "dawg_bytes": self.dawg.nbytes,
+            "pending": len(self.pending),
+            "merges": self.merges,
+        }
+
+
+def edit_distance(a, b):
+    """Levenshtein distance (insertions, deletions, substitutions)."""
+    if a == b:
+        return 0
+    # Only the part between the shared prefix and suffix needs the DP
+    start, end_a, end_b = 0, len(a), len(b)
+    while start < end_a and start < end_b and a[start] == b[start]:
+        start += 1
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return len(a) + len(b)
+    previous = range(len(b) + 1)
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        left = i
+        for j, cb in enumerate(b, 1):
+            best = previous[j - 1] if ca == cb else previous[j - 1] + 1
+            if previous[j] + 1 < best:
+                best = previous[j] + 1
+            if left + 1 < best:
+                best = left + 1
+            current.append(best)
+            left = best
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over edit distance: each child hangs off its
+    parent under their distance, so by the triangle inequality a query
+    only descends children whose edge is within max_distance of the
+    distance to their parent.
+    """
+    def __init__(self, words=()):
+        self.tree = None  # [word, {distance: subtree} or None]
+        self.size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if self.tree is None:
+            self.tree = [word, None]
+            self.size = 1
+            return
+        node = self.tree
+        while True:
+            d = edit_distance(word, node[0])
+            if d == 0:
+                return
+            if node[1] is None:
+                node[1] = {}
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [word, None]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, query, max_distance):
+        """(distance, word) pairs within max_distance of the query, unordered."""
+        found = []
+        stack = [self.tree] if self.tree is not None else []
+        while stack:
+            word, children = stack.pop()
+            d = edit_distance(query, word)
+            if d <= max_distance:
+                found.append((d, word))
+            if children:
+                for edge, child in children.items():
+                    if d - max_distance <= edge <= d + max_distance:
+                        stack.append(child)
+        return found
+
+    def __len__(self):
+        return self.size
+
 
 class Node:
+    # No per-node __dict__: a root costs five slots
+    __slots__ = ('root', 'entries', 'left', 'right', 'height')
+
     def __init__(self, root_str, derivatives=None):
         self.root = root_str
-        self.derivatives = derivatives if derivatives else []
+        # word -> interned scheme id, in insertion order; None until the first derivative
+        self.entries = None
         self.left = None
         self.right = None
         self.height = 1  # Keep this for AVL
+        for d in derivatives or ():
+            self.add_derivative(d['word'], d.get('pattern'))
+
+    def add_derivative(self, word, pattern=None):
+        """O(1) insert keyed on the word; False if the word is already recorded."""
+        if self.entries is None:
+            self.entries = {}
+        elif word in self.entries:
+            return False
+        self.entries[word] = SYMBOLS.intern(pattern)
+        return True
+
+    def copy(self):
+        clone = Node(self.root)
+        clone.entries = None if self.entries is None else self.entries.copy()
+        clone.left = self.left
+        clone.right = self.right
+        clone.height = self.height
+        return clone
+
+    @property
+    def derivatives(self):
+        """Derivatives as the {"word", "pattern"} dicts the UI and snapshots read."""
+        if not self.entries:
+            return []
+        strings = SYMBOLS.strings
+        return [{"word": word, "pattern": None if sid is None else strings[sid]}
+                for word, sid in self.entries.items()]
 
 class ArabicBST:
-    def __init__(self):
+    # Change-log entries kept for changes_since before older ones are dropped
+    CHANGELOG_LIMIT = 10000
+
+    def __init__(self, fold_hamza=False, compact_index=False, capacity=None):
         self.root_node = None
         # STEP 3: THE GAME CHANGER - Inverse Index (Cache)
-        # Complexity: O(1) for reverse lookup
-        self.inverse_index = {}
+        # Complexity: O(1) for reverse lookup, keyed on the normalized form;
+        # compact_index trades some lookup speed for a DAWG-backed index,
+        # capacity bounds the words cached by insert(..., cached=True)
+        if compact_index:
+            if capacity is not None:
+                raise ValueError("capacity needs the dict inverse index, not compact_index")
+            self.inverse_index = CompactInverseIndex(fold_hamza)
+        else:
+            self.inverse_index = InverseIndex(fold_hamza, capacity)
+            self.inverse_index.on_evict = self._forget
+        self.size = 0
+        # Callbacks notified as listener(event, root_str) when a new root is added
+        self.listeners = []
+        # Monotonic version and (version, root, derivative or None, removed)
+        # change log; the log holds versions changelog_floor+1 .. version
+        self.version = 0
+        self.changelog = []
+        self.changelog_floor = 0
+        # Fuzzy-lookup index, built on the first nearest_roots() call and
+        # kept up to date by insert() from then on
+        self.bk_tree = None
+        # Insert latency histogram (set metrics.enabled = False to skip timing)
+        self.metrics = Metrics()
+        # Nodes this tree may change in place once it shares nodes with a
+        # copy(); None (the usual case) means every node
+        self._owned = None
+
+    def subscribe(self, listener):
+        """Register a callback for 'root_added' events."""
+        self.listeners.append(listener)
+
+    # ========== CHANGE LOG (delta sync) ==========
+    def _log(self, root_str, derivative=None, removed=False):
+        self.version += 1
+        self.changelog.append((self.version, root_str, derivative, removed))
+        if len(self.changelog) > self.CHANGELOG_LIMIT:
+            drop = len(self.changelog) // 2
+            self.changelog_floor = self.changelog[drop - 1][0]
+            del self.changelog[:drop]
+
+    def changes_since(self, version):
+        """
+        Roots and derivatives added after `version`, O(changes), and the
+        [root, word] derivatives removed since (evicted cache entries),
+        to be applied before the additions. The tree shape (roots only)
+        is included when roots were added, since rotations may have moved
+        nodes; {"full": True} asks the caller to re-read to_dict() when
+        the log no longer reaches back.
+        """
+        if version < self.changelog_floor or version > self.version:
+            return {"version": self.version, "full": True}
+        roots, derivatives, removed = [], [], []
+        added = {}  # (root, word) -> position in derivatives
+        for _, root_str, d, is_removal in self.changelog[version - self.changelog_floor:]:
+            if d is None:
+                roots.append(root_str)
+            elif is_removal:
+                # Added and removed within the delta: the caller never saw it
+                position = added.pop((root_str, d['word']), None)
+                if position is None:
+                    removed.append([root_str, d['word']])
+                else:
+                    derivatives[position] = None
+            else:
+                added[(root_str, d['word'])] = len(derivatives)
+                derivatives.append([root_str, d['word'], d.get('pattern')])
+        delta = {"version": self.version, "roots": roots, "removed": removed,
+                 "derivatives": [d for d in derivatives if d is not None]}
+        if roots:
+            delta["shape"] = self.shape()
+        return delta
+
+    def shape(self):
+        """Tree structure without derivatives: nested [root, left, right] lists."""
+        if not self.root_node:
+            return None
+        result = [self.root_node.root, None, None]
+        stack = [(self.root_node, result)]
+        while stack:
+            current, out = stack.pop()
+            for i, child in ((1, current.left), (2, current.right)):
+                if child:
+                    out[i] = [child.root, None, None]
+                    stack.append((child, out[i]))
+        return result
+
+    # ========== COPY-ON-WRITE ==========
+    def copy(self):
+        """
+        A new, writable tree sharing every node with this one, in
+        O(changelog) plus the inverse index's overlays. From then on both
+        trees copy a node before changing it (path copying: an insert
+        clones the O(log n) nodes it walks through), so neither sees the
+        other's writes. Listeners stay with this tree.
+        """
+        clone = ArabicBST.__new__(ArabicBST)
+        clone.root_node = self.root_node
+        clone.inverse_index = self.inverse_index.copy()
+        if isinstance(clone.inverse_index, InverseIndex):
+            clone.inverse_index.on_evict = clone._forget
+        clone.size = self.size
+        clone.listeners = []
+        clone.version = self.version
+        clone.changelog = list(self.changelog)
+        clone.changelog_floor = self.changelog_floor
+        clone.bk_tree = None
+        clone.metrics = self.metrics
+        clone._owned = set()
+        self._owned = set()
+        return clone
+
+    def freeze(self):
+        """
+        Make reads side-effect free, for a tree read from several threads
+        and never written again: pending index forms are merged now, and
+        lookups stop counting hits and refreshing recency. nearest_roots()
+        then builds its BK-tree per call instead of keeping it.
+        """
+        if hasattr(self.inverse_index, 'compact'):
+            self.inverse_index.compact()
+        self.inverse_index.frozen = True
+
+    def _own(self, node):
+        """`node` itself if this tree may change it, else its private clone."""
+        owned = self._owned
+        if owned is None or node in owned:
+            return node
+        node = node.copy()
+        owned.add(node)
+        return node
+
+    def _own_path(self, root_str):
+        """search() that first clones the path to the root's node if it is shared."""
+        if self._owned is None:
+            return self.search(root_str)
+        parent, current = None, self.root_node
+        while current is not None:
+            node = self._own(current)
+            if parent is None:
+                self.root_node = node
+            elif root_str < parent.root:
+                parent.left = node
+            else:
+                parent.right = node
+            if node.root == root_str:
+                return node
+            parent, current = node, (node.left if root_str < node.root else node.right)
+        return None
 
     # ========== NEW AVL HELPER METHODS ==========
     def _height(self, node):
@@ -109,64 +722,232 @@ class ArabicBST:
         return node
 
     # ========== MODIFIED INSERT METHODS (AVL) ==========
-    def insert(self, root_str, derivatives=None):
-        """Insert a root into the AVL tree (O(log n)) and update Inverse Index (O(1))."""
+    def insert(self, root_str, derivatives=None, cached=False):
+        """
+        Insert a root into the AVL tree (O(log n)) and update Inverse Index (O(1)).
+        cached=True marks the derivatives as a cache (words met while
+        validating or generating) that the capacity may evict. A derivative
+        may carry its MATCH form as "normalized", which the index then reuses.
+        """
+        started = self.metrics.sample()
+        size_before = self.size
         self.root_node = self._insert_avl(self.root_node, root_str, derivatives)
+        if self.size != size_before:
+            if self.bk_tree is not None:
+                self.bk_tree.add(root_str)
+            for listener in self.listeners:
+                listener('root_added', root_str)
         
         # Automatically update the inverse index for all derivatives
         if derivatives:
             for d in derivatives:
-                self.inverse_index[d['word']] = root_str
+                self.inverse_index.add(d['word'], root_str, d.get('pattern'), not cached, d.get('normalized'))
+        if started is not None:
+            self.metrics.observe('insert', clock() - started)
 
     def _insert_avl(self, node, root_str, derivatives):
         """Recursive AVL insert with balancing"""
         # Step 1: Normal BST insertion
         if node is None:
-            return Node(root_str, derivatives)
+            self.size += 1
+            self._log(root_str)
+            node = Node(root_str)
+            if self._owned is not None:
+                self._owned.add(node)
+            for d in derivatives or ():
+                if node.add_derivative(d['word'], d.get('pattern')):
+                    self._log(root_str, d)
+            return node
 
+        node = self._own(node)
         if root_str < node.root:
             node.left = self._insert_avl(node.left, root_str, derivatives)
         elif root_str > node.root:
             node.right = self._insert_avl(node.right, root_str, derivatives)
         else:
-            # Root exists, update derivatives list
+            # Root exists: add the derivatives it does not have yet
             if derivatives:
                 for d in derivatives:
-                    exists = any(ex['word'] == d['word'] for ex in node.derivatives)
-                    if not exists:
-                        node.derivatives.append(d)
-                        self.inverse_index[d['word']] = root_str
+                    if node.add_derivative(d['word'], d.get('pattern')):
+                        self._log(root_str, d)
             return node
 
         # Step 2: Rebalance if needed
         return self._rebalance(node, root_str)
 
-    # ========== YOUR EXISTING METHODS (UNCHANGED) ==========
+    def insert_batch(self, groups, cached=False):
+        """
+        insert() for many (root, derivatives) groups, e.g. sorted by root.
+        Known roots take their derivatives in place, without the rebalancing
+        walk back up; only new roots go through the AVL insert.
+        """
+        index = self.inverse_index
+        for root_str, derivatives in groups:
+            node = self.search(root_str)
+            if node is None:
+                self.insert(root_str, derivatives, cached)
+                continue
+            if self._owned is not None:
+                node = self._own_path(root_str)
+            for d in derivatives:
+                if node.add_derivative(d['word'], d.get('pattern')):
+                    self._log(root_str, d)
+                index.add(d['word'], root_str, d.get('pattern'), not cached, d.get('normalized'))
+
+    def _forget(self, root_str, word, scheme):
+        """Drop an evicted cached derivative from its node as well (logged as a removal)."""
+        node = self.search(root_str)
+        if node is None or not node.entries or node.entries.get(word, -1) != SYMBOLS.intern(scheme):
+            return
+        node = self._own_path(root_str)
+        del node.entries[word]
+        self._log(root_str, {"word": word, "pattern": scheme}, removed=True)
+        # Another entry of this word for the same root may still be indexed
+        for r, other in self.inverse_index.exact_entries(word):
+            if r == root_str:
+                node.entries[word] = SYMBOLS.intern(other)
+                self._log(root_str, {"word": word, "pattern": other})
+                break
+
+    def set_capacity(self, capacity):
+        """Bound the cached inverse-index entries (None: unbounded), evicting now if needed."""
+        if not isinstance(self.inverse_index, InverseIndex):
+            raise ValueError("capacity needs the dict inverse index, not compact_index")
+        self.inverse_index.resize(capacity)
+
+    # ========== BULK CONSTRUCTION ==========
+    @classmethod
+    def bulk_load(cls, roots, derivatives=None, fold_hamza=False, compact_index=False, capacity=None):
+        """Dedupe and sort the roots, then build a perfectly balanced tree."""
+        return cls.from_sorted(sorted(set(roots)), derivatives, fold_hamza, compact_index, capacity)
+
+    @classmethod
+    def from_sorted(cls, sorted_roots, derivatives=None, fold_hamza=False, compact_index=False,
+                    capacity=None):
+        """
+        O(n) build from strictly increasing roots: the middle element of each
+        range becomes the subtree root, so no rotations are ever needed.
+        `derivatives` optionally maps a root to its derivative list (pinned).
+        """
+        bst = cls(fold_hamza, compact_index, capacity)
+        derivatives = derivatives or {}
+
+        def build(lo, hi):
+            # Recursion depth is log2(n), so stack use stays bounded
+            if lo >= hi:
+                return None
+            mid = (lo + hi) // 2
+            root_str = sorted_roots[mid]
+            node = Node(root_str, derivatives.get(root_str))
+            node.left = build(lo, mid)
+            node.right = build(mid + 1, hi)
+            node.height = 1 + max(bst._height(node.left), bst._height(node.right))
+            for d in derivatives.get(root_str, ()):
+                bst.inverse_index.add(d['word'], root_str, d.get('pattern'), True, d.get('normalized'))
+            return node
+
+        bst.root_node = build(0, len(sorted_roots))
+        bst.size = len(sorted_roots)
+        if compact_index:
+            bst.inverse_index.compact()
+        # Bulk-built content is not in the log: syncing from 0 means a full read
+        bst.version = bst.changelog_floor = 1
+        return bst
+
+    # ========== ITERATIVE TRAVERSAL ==========
     def search(self, root_str):
         """O(log n) search for a root."""
-        return self._search(self.root_node, root_str)
+        current = self.root_node
+        while current is not None and current.root != root_str:
+            current = current.left if root_str < current.root else current.right
+        return current
+
+    def inorder(self, node=None):
+        """Lazy in-order generator over nodes (explicit stack, no recursion)."""
+        stack, current = [], node or self.root_node
+        while stack or current:
+            while current:
+                stack.append(current)
+                current = current.left
+            current = stack.pop()
+            yield current
+            current = current.right
+
+    def roots(self):
+        """Root strings in sorted order."""
+        for node in self.inorder():
+            yield node.root
+
+    def range_scan(self, low=None, high=None):
+        """
+        Lazy generator of roots with low <= root <= high, in order.
+        Subtrees entirely below `low` are never entered, and the walk
+        stops at the first root above `high`.
+        """
+        stack, current = [], self.root_node
+        while stack or current:
+            while current:
+                if low is not None and current.root < low:
+                    current = current.right
+                    continue
+                stack.append(current)
+                current = current.left
+            if not stack:
+                return  # everything left is below `low`
+            current = stack.pop()
+            if high is not None and current.root > high:
+                return
+            yield current.root
+            current = current.right
+
+    def roots_with_prefix(self, prefix):
+        """Lazy generator of the roots starting with `prefix`, in order."""
+        for root_str in self.range_scan(prefix):
+            if not root_str.startswith(prefix):
+                return
+            yield root_str
 
-    def _search(self, current, root_str):
-        if current is None or current.root == root_str:
-            return current
-        if root_str < current.root:
-            return self._search(current.left, root_str)
-        return self._search(current.right, root_str)
+    def nearest_roots(self, query, max_distance=1):
+        """Known roots within max_distance edits of `query`, as (root, distance), closest first."""
+        tree = self.bk_tree
+        if tree is None:
+            tree = BKTree(self.roots())
+            if not self.inverse_index.frozen:
+                self.bk_tree = tree
+        return [(root_str, d) for d, root_str in sorted(tree.search(query, max_distance))]
 
-    def find_root_by_word(self, word):
-        """O(1) lookup using the Inverse Index."""
-        return self.inverse_index.get(word)
+    def find_root_by_word(self, word, normalized=None):
+        """
+        O(1) lookup using the Inverse Index: every (root, scheme) candidate for the word
+        (`normalized`: its MATCH form, when the caller already has it).
+        """
+        return self.inverse_index.lookup(word, normalized)
+
+    def stats(self):
+        """Tree size, inverse-index hit ratio and insert latency."""
+        return {
+            "roots": self.size,
+            "inverse_index": self.inverse_index.stats(),
+            **self.metrics.snapshot(),
+        }
 
     def to_dict(self, node=None):
         target = node if node else self.root_node
         if not target:
             return None
-        return {
-            "root": target.root,
-            "derivatives": target.derivatives,
-            "left": self.to_dict(target.left) if target.left else None,
-            "right": self.to_dict(target.right) if target.right else None
-        }
+        result = {}
+        stack = [(target, result)]
+        while stack:
+            current, out = stack.pop()
+            out["root"] = current.root
+            out["derivatives"] = current.derivatives
+            out["left"] = {} if current.left else None
+            out["right"] = {} if current.right else None
+            if current.left:
+                stack.append((current.left, out["left"]))
+            if current.right:
+                stack.append((current.right, out["right"]))
+        return result
 
     # Optional: Add this helper method to see the tree structure with heights
     def print_tree(self, node=None, prefix="", is_left=True):
@@ -176,11 +957,16 @@ class ArabicBST:
             if node is None:
                 print("Empty tree")
                 return
-        
-        if node.right:
-            self.print_tree(node.right, prefix + ("│   " if is_left else "    "), False)
-        
-        print(prefix + ("└── " if is_left else "┌── ") + f"{node.root} (h={node.height})")
-        
-        if node.left:
-            self.print_tree(node.left, prefix + ("    " if is_left else "│   "), True)
\ No newline at end of file
+
+        # Reverse in-order (right, node, left); expanded entries print themselves
+        stack = [(node, prefix, is_left, False)]
+        while stack:
+            current, pre, left_side, expanded = stack.pop()
+            if expanded:
+                print(pre + ("└── " if left_side else "┌── ") + f"{current.root} (h={current.height})")
+                continue
+            if current.left:
+                stack.append((current.left, pre + ("    " if left_side else "│   "), True, False))
+            stack.append((current, pre, left_side, True))
+            if current.right:
+                stack.append((current.right, pre + ("│   " if left_side else "    "), False, False))
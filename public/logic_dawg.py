@@ -0,0 +1,230 @@
+import struct
+from array import array
+from bisect import bisect_left
+
+# Flat layout (native uint32 arrays, little-endian on every platform we ship):
+#   header           MAGIC, then <IIIIIII: root, states, edges, words,
+#                    payload entries, strings, string blob bytes
+#   info             per state: (words accepted from it << 1) | final
+#   first_edge       (states + 1) offsets into labels / targets
+#   labels, targets  per edge: code point, target state (sorted by label per state)
+#   edge_ranks       per edge: keys sorted before those reached through it, counted
+#                    from its state (the state's own key, then earlier siblings)
+#   payload_offsets  (words + 1) offsets into the payload columns, by word rank
+#   payload_roots    per payload entry: string id of the root
+#   payload_schemes  per payload entry: string id of the scheme (NO_STRING for None)
+#   string_offsets   (strings + 1) byte offsets into the UTF-8 blob
+MAGIC = b'MMDAWG01'
+_HEADER = struct.Struct('<IIIIIII')
+NO_STRING = 0xFFFFFFFF
+
+
+class DAWG:
+    """
+    Minimized acyclic automaton (DAWG) mapping string keys to tuples of
+    (root, scheme) entries. Keys that share a prefix or a suffix share
+    states, and each state records how many keys it accepts, so the
+    rank of a key in sorted order indexes its payload without storing
+    payloads in the automaton itself. Everything lives in flat uint32
+    arrays, which to_bytes() writes out as-is and from_bytes() maps back
+    without copying.
+    """
+    def __init__(self, root, info, first_edge, labels, targets, edge_ranks,
+                 payload_offsets, payload_roots, payload_schemes, strings):
+        self.root = root
+        self.info = info
+        self.first_edge = first_edge
+        self.labels = labels
+        self.targets = targets
+        self.edge_ranks = edge_ranks
+        self.payload_offsets = payload_offsets
+        self.payload_roots = payload_roots
+        self.payload_schemes = payload_schemes
+        self.strings = strings
+
+    # ========== CONSTRUCTION ==========
+    @classmethod
+    def build(cls, items):
+        """
+        Build from (key, entries) pairs in strictly increasing key order,
+        minimizing as it goes (Daciuk et al.): once a key is done, the
+        branch it no longer shares with the next key is merged with any
+        equivalent state already registered.
+        """
+        register = {}
+        finals, counts, edges = [], [], []
+
+        def freeze(node):
+            signature = (node[0], tuple(node[1]))
+            sid = register.get(signature)
+            if sid is None:
+                sid = register[signature] = len(finals)
+                finals.append(node[0])
+                edges.append(signature[1])
+                counts.append(node[0] + sum(counts[t] for _, t in signature[1]))
+            return sid
+
+        def collapse(depth):
+            while len(path) > depth + 1:
+                child = path.pop()
+                label = path[-1][1][-1][0]
+                path[-1][1][-1] = (label, freeze(child))
+
+        path = [[False, []]]  # [final, [(label, target)]] for each prefix of the current key
+        previous = None
+        payloads = []
+        for key, entries in items:
+            if previous is not None and key <= previous:
+                raise ValueError("DAWG keys must be unique and sorted")
+            common = 0
+            if previous is not None:
+                limit = min(len(key), len(previous))
+                while common < limit and key[common] == previous[common]:
+                    common += 1
+            collapse(common)
+            for ch in key[common:]:
+                node = [False, []]
+                path[-1][1].append((ch, None))
+                path.append(node)
+            path[-1][0] = True
+            payloads.append(entries)
+            previous = key
+        collapse(0)
+        root = freeze(path[0])
+
+        info = array('I', (count << 1 | final for count, final in zip(counts, finals)))
+        first_edge, labels, targets, edge_ranks = array('I', [0]), array('I'), array('I'), array('I')
+        for final, state_edges in zip(finals, edges):
+            skipped = int(final)
+            for label, target in state_edges:
+                labels.append(ord(label))
+                targets.append(target)
+                edge_ranks.append(skipped)
+                skipped += counts[target]
+            first_edge.append(len(labels))
+
+        ids, strings = {}, []
+
+        def intern(text):
+            if text is None:
+                return NO_STRING
+            sid = ids.get(text)
+            if sid is None:
+                sid = ids[text] = len(strings)
+                strings.append(text)
+            return sid
+
+        payload_offsets, payload_roots, payload_schemes = array('I', [0]), array('I'), array('I')
+        for entries in payloads:
+            for root_str, scheme in entries:
+                payload_roots.append(intern(root_str))
+                payload_schemes.append(intern(scheme))
+            payload_offsets.append(len(payload_roots))
+        return cls(root, info, first_edge, labels, targets, edge_ranks,
+                   payload_offsets, payload_roots, payload_schemes, strings)
+
+    # ========== QUERIES ==========
+    def _walk(self, key):
+        """(state reached by `key`, rank of the first key at or below it), or None."""
+        first_edge, labels, targets, edge_ranks = self.first_edge, self.labels, self.targets, self.edge_ranks
+        state, rank = self.root, 0
+        for ch in key:
+            hi = first_edge[state + 1]
+            code = ord(ch)
+            i = bisect_left(labels, code, first_edge[state], hi)
+            if i == hi or labels[i] != code:
+                return None
+            rank += edge_ranks[i]
+            state = targets[i]
+        return state, rank
+
+    def _entries(self, rank):
+        strings = self.strings
+        return tuple(
+            (strings[self.payload_roots[i]],
+             None if self.payload_schemes[i] == NO_STRING else strings[self.payload_schemes[i]])
+            for i in range(self.payload_offsets[rank], self.payload_offsets[rank + 1])
+        )
+
+    def get(self, key, default=None):
+        found = self._walk(key)
+        if found is None or not self.info[found[0]] & 1:
+            return default
+        return self._entries(found[1])
+
+    def __contains__(self, key):
+        found = self._walk(key)
+        return found is not None and bool(self.info[found[0]] & 1)
+
+    def __len__(self):
+        return self.info[self.root] >> 1 if len(self.info) else 0
+
+    def count(self, prefix=''):
+        """Number of keys starting with `prefix`, read off its state: O(len(prefix))."""
+        if not len(self.info):
+            return 0
+        found = self._walk(prefix)
+        return self.info[found[0]] >> 1 if found is not None else 0
+
+    def items(self, prefix=''):
+        """Lazy (key, entries) pairs for every key starting with `prefix`, in order."""
+        found = self._walk(prefix)
+        if found is None:
+            return
+        state, rank = found
+        info, first_edge, labels, targets = self.info, self.first_edge, self.labels, self.targets
+        stack = [(state, prefix)]
+        while stack:
+            state, key = stack.pop()
+            if info[state] & 1:
+                yield key, self._entries(rank)
+                rank += 1
+            # Reversed, so the smallest label is expanded first
+            for i in range(first_edge[state + 1] - 1, first_edge[state] - 1, -1):
+                stack.append((targets[i], key + chr(labels[i])))
+
+    def keys(self, prefix=''):
+        for key, _ in self.items(prefix):
+            yield key
+
+    # ========== FLAT BUFFER ==========
+    def _arrays(self):
+        return (self.info, self.first_edge, self.labels, self.targets, self.edge_ranks,
+                self.payload_offsets, self.payload_roots, self.payload_schemes)
+
+    @property
+    def nbytes(self):
+        """Size of the flat representation (what to_bytes() writes)."""
+        return len(MAGIC) + _HEADER.size + sum(len(a) * 4 for a in self._arrays()) \
+            + 4 * (len(self.strings) + 1) + sum(len(s.encode('utf-8')) for s in self.strings)
+
+    def to_bytes(self):
+        blob = [s.encode('utf-8') for s in self.strings]
+        string_offsets = array('I', [0])
+        for encoded in blob:
+            string_offsets.append(string_offsets[-1] + len(encoded))
+        parts = [MAGIC, _HEADER.pack(self.root, len(self.info), len(self.labels),
+                                     len(self.payload_offsets) - 1, len(self.payload_roots),
+                                     len(self.strings), string_offsets[-1])]
+        parts.extend(array('I', a).tobytes() for a in self._arrays())
+        parts.append(string_offsets.tobytes())
+        parts.extend(blob)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """Read a to_bytes() buffer; the arrays are views into it, not copies."""
+        view = memoryview(buffer)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a DAWG buffer")
+        pos = len(MAGIC)
+        root, states, edges, words, entries, string_count, blob_size = _HEADER.unpack_from(view, pos)
+        pos += _HEADER.size
+        arrays = []
+        for length in (states, states + 1, edges, edges, edges, words + 1, entries, entries, string_count + 1):
+            arrays.append(view[pos:pos + 4 * length].cast('I'))
+            pos += 4 * length
+        string_offsets = arrays.pop()
+        strings = [bytes(view[pos + string_offsets[i]:pos + string_offsets[i + 1]]).decode('utf-8')
+                   for i in range(string_count)]
+        return cls(root, *arrays, strings)
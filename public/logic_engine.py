@@ -1,265 +1,996 @@
+import functools
+import itertools
+import json
+import logging
 import re
+import sys
+from collections import OrderedDict
+
+from logic_metrics import Metrics, clock
+from logic_normalize import MATCH, table
+
+# Pattern letters standing for the three root consonants (ف ع ل)
+_SLOTS = {'ف': 0, 'ع': 1, 'ل': 2}
+
+# ========== IRREGULARITY RULES (dispatch table) ==========
+# Root weakness classes, in the order their rewrites are applied
+REDOUBLED = 'redoubled'
+HOLLOW = 'hollow'
+HAMZA_1 = 'hamza_1'
+HAMZA_2 = 'hamza_2'
+HAMZA_3 = 'hamza_3'
+ASSIMILATED = 'assimilated'
+DEFECTIVE = 'defective'
+
+_HAMZAS = ('ء', 'أ', 'إ', 'ؤ', 'ئ')
+_WEAK = ('و', 'ي')
+_SUN_LETTERS = frozenset(['ت', 'ث', 'د', 'ذ', 'ر', 'ز', 'س', 'ش', 'ص', 'ض', 'ط', 'ظ', 'ل', 'ن'])
+
+# Compiled templates, rule plans and pruning signatures kept per pattern,
+# weakness classes per root; both can come from requests (serve.py
+# /generate), so the memos are LRUs and the least recently used entries go
+PATTERN_CACHE_SIZE = 1024
+ROOT_CACHE_SIZE = 1 << 17
+
+# Placeholder radicals used to locate root slots when deriving skeletons
+_MARKERS = ('\uE000', '\uE001', '\uE002')
+# Radicals a placeholder stands for: consonants no rewrite rule names
+_ORDINARY = frozenset('بتثجحخدذرزسشصضطظعغفقكلمنه')
+
+_CLASS_MESSAGES = {
+    REDOUBLED: "Redoubled root detected (c2 == c3)",
+    HOLLOW: "Hollow root detected (c2 is و or ي)",
+    HAMZA_1: "First letter hamza detected",
+    HAMZA_2: "Second letter hamza detected",
+    HAMZA_3: "Third letter hamza detected",
+    ASSIMILATED: "Assimilated root detected (c1 is و or ي)",
+    DEFECTIVE: "Defective root detected (c3 is و or ي)",
+}
+
+# Redoubled regex, compiled once per repeated letter
+_redoubled_res = {}
+
+
+def _redoubled(word, c1, c2, c3):
+    regex = _redoubled_res.get(c2)
+    if regex is None:
+        regex = _redoubled_res[c2] = re.compile(f"{re.escape(c2)}([\u064B-\u0652]*){re.escape(c2)}")
+    return regex.sub(f"{c2}ّ\\1", word)
+
+
+def _third_hamza_ifti3al(word, c1, c2, c3):
+    if word.endswith('اأ'):
+        return word[:-2] + 'اء'
+    return word.replace(c3, "اء")
+
+
+def _third_hamza_istif3al(word, c1, c2, c3):
+    # The word ends with "اأ" (alif + hamza): the hamza sits on the line
+    if word.endswith('اأ'):
+        return word[:-2] + 'اء'
+    if word.endswith('أ'):
+        return word[:-1] + 'ء'
+    return word.replace('أ', 'ء')
+
+
+def _defective_maf3ul(word, c1, c2, c3):
+    return word if word.endswith('يّ') else word + 'يّ'
+
+
+# (class, pattern) -> rewrite(word, c1, c2, c3); pattern None matches any pattern
+_RULES = {
+    (REDOUBLED, None): _redoubled,
+
+    (HOLLOW, 'فَاعِل'): lambda w, c1, c2, c3: w.replace(f"َا{c2}", "َائ"),
+    (HOLLOW, 'فَعَلَ'): lambda w, c1, c2, c3: f"{c1}َالَ",
+    (HOLLOW, 'يَفْعَلُ'): lambda w, c1, c2, c3: w.replace(c2, "ُو"),
+    (HOLLOW, 'مَفْعُول'): lambda w, c1, c2, c3: w.replace(c2, "ُو"),
+    (HOLLOW, 'اِفْتِعَال'): lambda w, c1, c2, c3: w.replace(f"ت{c2}", "تِي"),
+    (HOLLOW, 'اِسْتِفْعَال'): lambda w, c1, c2, c3: w.replace(f"ت{c2}", "تِي"),
+
+    (HAMZA_1, 'فَاعِل'): lambda w, c1, c2, c3: w.replace("أَأ", "آ"),
+    (HAMZA_1, 'اِفْتِعَال'): lambda w, c1, c2, c3: w.replace("ائ", "ئ"),
+    (HAMZA_1, 'اِسْتِفْعَال'): lambda w, c1, c2, c3: w.replace("ائ", "ئ"),
+
+    (HAMZA_2, 'فَاعِل'): lambda w, c1, c2, c3: w.replace(f"ا{c2}", "ائ"),
+    (HAMZA_2, 'مَفْعُول'): lambda w, c1, c2, c3: w.replace(c2, "ؤ"),
+    (HAMZA_2, 'اِفْتِعَال'): lambda w, c1, c2, c3: w.replace("تأ", "تئ"),
+    (HAMZA_2, 'اِسْتِفْعَال'): lambda w, c1, c2, c3: w.replace("تأ", "تئ"),
+
+    (HAMZA_3, 'فَاعِل'): lambda w, c1, c2, c3: w.replace(c3, "ئ"),
+    (HAMZA_3, 'مَفْعُول'): lambda w, c1, c2, c3: w.replace(c3, "ء").replace("ؤء", "وء"),
+    (HAMZA_3, 'اِفْتِعَال'): _third_hamza_ifti3al,
+    (HAMZA_3, 'اِسْتِفْعَال'): _third_hamza_istif3al,
+    (HAMZA_3, 'فَعَلَ'): lambda w, c1, c2, c3: w.replace(c3, "أ"),
+
+    (ASSIMILATED, 'اِفْتِعَال'): lambda w, c1, c2, c3: w.replace(f"{c1}ت", "تّ"),
+    (ASSIMILATED, 'اِسْتِفْعَال'): lambda w, c1, c2, c3: w.replace(f"{c1}ت", "تّ"),
+
+    (DEFECTIVE, 'فَاعِل'): lambda w, c1, c2, c3: w.replace(f"{c3}ِ", "ٍ"),
+    (DEFECTIVE, 'مَفْعُول'): _defective_maf3ul,
+}
+
+
+def classify_root(root):
+    """Weakness classes of a trilateral root, in rule application order"""
+    c1, c2, c3 = root[0], root[1], root[2]
+    classes = []
+    if c2 == c3:
+        classes.append(REDOUBLED)
+    if c2 in _WEAK:
+        classes.append(HOLLOW)
+    if c1 in _HAMZAS:
+        classes.append(HAMZA_1)
+    if c2 in _HAMZAS:
+        classes.append(HAMZA_2)
+    if c3 in _HAMZAS:
+        classes.append(HAMZA_3)
+    if c1 in _WEAK:
+        classes.append(ASSIMILATED)
+    if c3 in _WEAK:
+        classes.append(DEFECTIVE)
+    return tuple(classes)
+
+
+# Engine counters and latency histograms, exposed as MorphEngine.metrics;
+# apply_scheme runs in under a microsecond on memo hits, so time 1 call in 16
+metrics = Metrics(sample_every=16)
+
+
+def add_definite_article(word):
+    """Prefix the article, assimilating it before sun letters"""
+    if word.startswith('أ') or word.startswith('إ') or word.startswith('آ'):
+        if metrics.enabled:
+            metrics.incr('article hamza')
+        return 'ال' + word[1:]
+    if word and word[0] in _SUN_LETTERS:
+        if metrics.enabled:
+            metrics.incr('article sun')
+        return word[0] + 'ّ' + word[1:]
+    if metrics.enabled:
+        metrics.incr('article moon')
+    return 'ال' + word
+
+
+
+class DerivationCache:
+    """
+    Bounded LRU memo of apply_scheme results keyed by (root, pattern, is_definite).
+    Entries for a pattern are dropped when that pattern is removed or
+    replaced in an attached SchemeHashTable. Safe to share between
+    threads without a lock: a key evicted by another thread between two
+    steps only costs a recomputation.
+    """
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.by_pattern = {}  # pattern -> keys cached for it
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        word = self.entries.get(key)
+        if word is None:
+            self.misses += 1
+            return None
+        try:
+            self.entries.move_to_end(key)
+        except KeyError:  # evicted meanwhile by another thread
+            pass
+        self.hits += 1
+        return word
+
+    def put(self, key, word):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = word
+        self.by_pattern.setdefault(key[1], set()).add(key)
+        while len(self.entries) > self.maxsize:
+            try:
+                old_key, _ = self.entries.popitem(last=False)
+            except KeyError:  # emptied meanwhile by another thread
+                break
+            self._unlink(old_key)
+            self.evictions += 1
+
+    def _unlink(self, key):
+        keys = self.by_pattern.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.by_pattern[key[1]]
+
+    def invalidate_pattern(self, pattern):
+        """Drop every cached derivation of one pattern."""
+        for key in self.by_pattern.pop(pattern, ()):
+            self.entries.pop(key, None)
+
+    def attach(self, ht):
+        """Invalidate automatically on SchemeHashTable.update / remove."""
+        ht.subscribe(self._on_scheme_event)
+        return self
+
+    def _on_scheme_event(self, event, name, pattern):
+        if event == 'scheme_removed':
+            self.invalidate_pattern(pattern)
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self.entries) > max(maxsize, 0):
+            old_key, _ = self.entries.popitem(last=False)
+            self._unlink(old_key)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.by_pattern.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
 class MorphEngine:
+    # Optional step-by-step tracer (any callable taking a string, e.g. print).
+    # None keeps generation and validation silent.
+    tracer = None
+
+
+    # (scheme key, skeleton index) for the last scheme table analyzed
+    _skeleton_cache = None
+
+    # Precompiled logic_normalize table used to compare words with generated forms
+    _match_table = table(MATCH)
+
+    # LRU memo in front of apply_scheme (None disables it)
+    derivations = DerivationCache()
+
+    # Rule-branch / validate-path counters and latency histograms
+    metrics = metrics
+
     @staticmethod
-    def _strip_tashkeel(text):
-        """Remove diacritics from Arabic text"""
-        tashkeel_re = re.compile(r'[\u064B-\u0652]')
-        return tashkeel_re.sub('', text)
+    def configure_cache(maxsize):
+        """Set the derivation memo size (0 disables caching)"""
+        MorphEngine.derivations.resize(maxsize)
+        return MorphEngine.derivations
 
     @staticmethod
-    def _handle_irregularities(word, root, pattern, is_definite=False):
-        """Handle special Arabic morphological cases with logging"""
-        print(f"\n  🔧 _handle_irregularities ENTERED")
-        print(f"    Input word: '{word}'")
-        print(f"    Root: '{root}'")
-        print(f"    Pattern: '{pattern}'")
-        print(f"    is_definite: {is_definite}")
-        
+    def set_tracer(tracer):
+        """Enable tracing through a callable, or disable it with None"""
+        MorphEngine.tracer = tracer
+
+    @staticmethod
+    def enable_logging(logger=None, level=logging.DEBUG):
+        """Send the trace to a logging.Logger instead of a callable"""
+        logger = logger or logging.getLogger("morph_engine")
+        MorphEngine.tracer = lambda message: logger.log(level, message)
+
+    @staticmethod
+    def metrics_snapshot():
+        """Engine counters, latencies and derivation memo stats as a dict"""
+        snapshot = MorphEngine.metrics.snapshot()
+        if MorphEngine.derivations is not None:
+            snapshot["derivations"] = MorphEngine.derivations.stats()
+        return snapshot
+
+    @staticmethod
+    @functools.lru_cache(maxsize=PATTERN_CACHE_SIZE)
+    def _compile(pattern):
+        """
+        Compile a vocalized pattern once into a slot template:
+        literal segments with {0}/{1}/{2} positions for c1/c2/c3.
+        """
+        return "".join(
+            "{%d}" % _SLOTS[char] if char in _SLOTS
+            else char.replace("{", "{{").replace("}", "}}")
+            for char in pattern
+        )
+
+    @staticmethod
+    def _normalize(text):
+        """Comparison form: tashkeel and tatweel removed, ى unified (one translate pass)"""
+        return text.translate(MorphEngine._match_table)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=ROOT_CACHE_SIZE)
+    def root_classes(root):
+        """Weakness classes of a root, memoized for the most recent roots"""
+        return classify_root(root)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=PATTERN_CACHE_SIZE)
+    def _rule_plan(classes, pattern):
+        """
+        Rewrites that apply to a (root classes, pattern) pair, compiled once,
+        each with the counter name it is reported under
+        """
+        plan = []
+        for cls in classes:
+            rule = _RULES.get((cls, pattern))
+            label = f"rule {cls} {pattern}"
+            if rule is None:
+                rule = _RULES.get((cls, None))
+                label = f"rule {cls} *"
+            plan.append((cls, rule, label))
+        return tuple(plan)
+
+    @staticmethod
+    def _handle_irregularities(word, root, pattern, is_definite=False, classes=None):
+        """Handle special Arabic morphological cases with optional tracing"""
+        trace = MorphEngine.tracer
+        if classes is None:
+            classes = MorphEngine.root_classes(root)
+
+        # Regular root: nothing beyond the template fill (and the article)
+        if not classes and not trace:
+            return add_definite_article(word) if is_definite else word
+
+        if trace:
+            trace(f"\n  🔧 _handle_irregularities ENTERED")
+            trace(f"    Input word: '{word}'")
+            trace(f"    Root: '{root}'")
+            trace(f"    Pattern: '{pattern}'")
+            trace(f"    is_definite: {is_definite}")
+            trace(f"    Root letters: c1='{root[0]}', c2='{root[1]}', c3='{root[2]}'")
+
         c1, c2, c3 = root[0], root[1], root[2]
-        print(f"    Root letters: c1='{c1}', c2='{c2}', c3='{c3}'")
-        
-        original_word = word
-        
-        # Redoubled roots
-        if c2 == c3:
-            print(f"    📍 Redoubled root detected (c2 == c3)")
-            pattern_regex = f"{c2}([\u064B-\u0652]*){c2}"
-            if re.search(pattern_regex, word):
-                word = re.sub(pattern_regex, f"{c2}ّ\\1", word)
-                print(f"    Applied redoubled rule: '{original_word}' → '{word}'")
-
-        # Hollow roots
-        if c2 in ['و', 'ي']:
-            print(f"    📍 Hollow root detected (c2 is و or ي)")
-            if pattern == 'فَاعِل':
-                word = word.replace(f"َا{c2}", "َائ")
-                print(f"    Applied hollow فَاعِل rule: '{original_word}' → '{word}'")
-            elif pattern == 'فَعَلَ':
-                word = f"{c1}َالَ"
-                print(f"    Applied hollow فَعَلَ rule: '{original_word}' → '{word}'")
-            elif pattern == 'يَفْعَلُ':
-                word = word.replace(f"{c2}", "ُو")
-                print(f"    Applied hollow يَفْعَلُ rule: '{original_word}' → '{word}'")
-            elif pattern == 'مَفْعُول':
-                word = word.replace(f"{c2}", "ُو")
-                print(f"    Applied hollow مَفْعُول rule: '{original_word}' → '{word}'")
-            elif pattern in ['اِفْتِعَال', 'اِسْتِفْعَال']:
-                if c2 == 'و':
-                    word = word.replace(f"ت{c2}", "تِي")
-                elif c2 == 'ي':
-                    word = word.replace(f"ت{c2}", "تِي")
-                print(f"    Applied hollow {pattern} rule: '{original_word}' → '{word}'")
-        
-        # Hamzated roots - First letter
-        if c1 in ['ء', 'أ', 'إ', 'ؤ', 'ئ']:
-            print(f"    📍 First letter hamza detected")
-            if pattern == 'فَاعِل':
-                word = word.replace("أَأ", "آ")
-                print(f"    Applied first hamza فَاعِل rule: '{original_word}' → '{word}'")
-            elif pattern in ['اِفْتِعَال', 'اِسْتِفْعَال']:
-                word = word.replace("ائ", "ئ")
-                print(f"    Applied first hamza {pattern} rule: '{original_word}' → '{word}'")
-        
-        # Hamzated roots - Second letter
-        if c2 in ['ء', 'أ', 'إ', 'ؤ', 'ئ']:
-            print(f"    📍 Second letter hamza detected")
-            if pattern == 'فَاعِل':
-                word = word.replace(f"ا{c2}", "ائ")
-                print(f"    Applied second hamza فَاعِل rule: '{original_word}' → '{word}'")
-            elif pattern == 'مَفْعُول':
-                word = word.replace(f"{c2}", "ؤ")
-                print(f"    Applied second hamza مَفْعُول rule: '{original_word}' → '{word}'")
-            elif pattern in ['اِفْتِعَال', 'اِسْتِفْعَال']:
-                word = word.replace("تأ", "تئ")
-                print(f"    Applied second hamza {pattern} rule: '{original_word}' → '{word}'")
-        
-        # Hamzated roots - Third letter (FIXED for اِسْتِفْعَال)
-        if c3 in ['ء', 'أ', 'إ', 'ؤ', 'ئ']:
-            print(f"    📍 Third letter hamza detected")
-            original_before = word
-            
-            if pattern == 'فَاعِل':
-                word = word.replace(f"{c3}", "ئ")
-                print(f"    Applied third hamza فَاعِل rule: '{original_before}' → '{word}'")
-            
-            elif pattern == 'مَفْعُول':
-                word = word.replace(f"{c3}", "ء")
-                word = word.replace("ؤء", "وء")
-                print(f"    Applied third hamza مَفْعُول rule: '{original_before}' → '{word}'")
-            
-            elif pattern == 'اِفْتِعَال':
-                if word.endswith('اأ'):
-                    word = word[:-2] + 'اء'
-                    print(f"    Applied third hamza اِفْتِعَال rule: '{original_before}' → '{word}'")
-                else:
-                    word = word.replace(f"{c3}", "اء")
-                    print(f"    Applied third hamza اِفْتِعَال rule: '{original_before}' → '{word}'")
-            
-            elif pattern == 'اِسْتِفْعَال':  # YOUR PATTERN with kasra
-                print(f"    ⭐ Processing استفعال pattern with kasra")
-                # The word currently ends with "اأ" (alif + hamza)
-                # We need to change it to "اء" (alif + hamza on the alif)
-                if word.endswith('اأ'):
-                    word = word[:-2] + 'اء'
-                    print(f"    Fixed final hamza (اأ → اء): '{original_before}' → '{word}'")
-                elif word.endswith('أ'):
-                    word = word[:-1] + 'ء'
-                    print(f"    Fixed final hamza (أ → ء): '{original_before}' → '{word}'")
-                else:
-                    # Fallback: try to replace the hamza directly
-                    word = word.replace('أ', 'ء')
-                    print(f"    Fixed final hamza (fallback): '{original_before}' → '{word}'")
-            
-            elif pattern == 'فَعَلَ':
-                word = word.replace(f"{c3}", "أ")
-                print(f"    Applied third hamza فَعَلَ rule: '{original_before}' → '{word}'")
-
-        # Assimilated roots
-        if c1 in ['و', 'ي']:
-            print(f"    📍 Assimilated root detected (c1 is و or ي)")
-            if pattern in ['اِفْتِعَال', 'اِسْتِفْعَال']:
-                word = word.replace(f"{c1}ت", "تّ")
-                print(f"    Applied assimilated {pattern} rule: '{original_word}' → '{word}'")
-
-        # Defective roots
-        if c3 in ['و', 'ي']:
-            print(f"    📍 Defective root detected (c3 is و or ي)")
-            if pattern == 'فَاعِل':
-                word = word.replace(f"{c3}ِ", "ٍ")
-                print(f"    Applied defective فَاعِل rule: '{original_word}' → '{word}'")
-            elif pattern == 'مَفْعُول':
-                if not word.endswith('يّ'):
-                    word = word + 'يّ'
-                    print(f"    Applied defective مَفْعُول rule: '{original_word}' → '{word}'")
-
-        # Definite article
+        counting = MorphEngine.metrics.enabled
+        for cls, rule, label in MorphEngine._rule_plan(classes, pattern):
+            if trace:
+                trace(f"    📍 {_CLASS_MESSAGES[cls]}")
+            if rule is not None:
+                before = word
+                word = rule(word, c1, c2, c3)
+                if counting:
+                    MorphEngine.metrics.incr(label)
+                if trace:
+                    trace(f"    Applied {cls} {pattern} rule: '{before}' → '{word}'")
+
         if is_definite:
-            print(f"    📍 Adding definite article")
-            sun_letters = ['ت', 'ث', 'د', 'ذ', 'ر', 'ز', 'س', 'ش', 'ص', 'ض', 'ط', 'ظ', 'ل', 'ن']
-            if word.startswith('أ') or word.startswith('إ') or word.startswith('آ'):
-                word = 'ال' + word[1:]
-                print(f"    Added definite article (hamza case): '{original_word}' → '{word}'")
-            elif word and word[0] in sun_letters:
-                word = word[0] + 'ّ' + word[1:]
-                print(f"    Added definite article (sun letter): '{original_word}' → '{word}'")
-            else:
-                word = 'ال' + word
-                print(f"    Added definite article (moon letter): '{original_word}' → '{word}'")
+            before = word
+            word = add_definite_article(word)
+            if trace:
+                trace(f"    Added definite article: '{before}' → '{word}'")
 
-        print(f"  🔧 _handle_irregularities EXIT: '{word}'")
+        if trace:
+            trace(f"  🔧 _handle_irregularities EXIT: '{word}'")
         return word
 
     @staticmethod
     def apply_scheme(root, pattern, is_definite=False):
         """
         Generate a word from a root and morphological pattern
+        (memoized in MorphEngine.derivations unless tracing)
         """
-        print(f"\n🔵🔵🔵 apply_scheme CALLED 🔵🔵🔵")
-        print(f"   Parameters:")
-        print(f"     root: '{root}'")
-        print(f"     pattern: '{pattern}'")
-        print(f"     is_definite: {is_definite}")
+        started = MorphEngine.metrics.sample()
+        cache = MorphEngine.derivations
+        if cache is None or MorphEngine.tracer:
+            word = MorphEngine._generate(root, pattern, is_definite)
+        else:
+            key = (root, pattern, bool(is_definite))
+            word = cache.get(key)
+            if word is None:
+                word = MorphEngine._generate(root, pattern, is_definite)
+                cache.put(key, word)
+        if started is not None:
+            MorphEngine.metrics.observe('apply_scheme', clock() - started)
+        return word
+
+    @staticmethod
+    def _generate(root, pattern, is_definite=False, classes=None):
+        """Uncached generation: template fill, then irregularities"""
+        trace = MorphEngine.tracer
+        if trace:
+            trace(f"\n🔵🔵🔵 apply_scheme CALLED 🔵🔵🔵")
+            trace(f"   Parameters:")
+            trace(f"     root: '{root}'")
+            trace(f"     pattern: '{pattern}'")
+            trace(f"     is_definite: {is_definite}")
         
         if len(root) != 3:
-            print(f"   ❌ ERROR: Root length is {len(root)}, must be 3")
+            if trace:
+                trace(f"   ❌ ERROR: Root length is {len(root)}, must be 3")
             return ""
         
-        c1, c2, c3 = root[0], root[1], root[2]
-        print(f"   Root letters: c1='{c1}', c2='{c2}', c3='{c3}'")
+        # Fast path: one fill of the precompiled template, no per-char concat
+        result = MorphEngine._compile(pattern).format(root[0], root[1], root[2])
         
-        result = ""
-        print(f"   Building word character by character:")
+        if trace:
+            MorphEngine._trace_steps(trace, root, pattern)
+            trace(f"   Basic generation result (before irregularities): '{result}'")
         
+        final_result = MorphEngine._handle_irregularities(result, root, pattern, is_definite, classes)
+        if trace:
+            trace(f"   🔵 FINAL RESULT: '{final_result}'")
+            trace(f"🔵🔵🔵 apply_scheme COMPLETED 🔵🔵🔵\n")
+        
+        return final_result
+
+    # ========== STREAMING GENERATION (root x scheme) ==========
+    @staticmethod
+    def derive_all(roots, schemes, names=None, classes=None, is_definite=False, chunk_size=None):
+        """
+        Lazy (root, scheme name, vocalized, normalized) records for every
+        root of `roots` (any iterable: bst.roots(), an open roots file...)
+        times every scheme of `schemes` (a SchemeHashTable or a list),
+        root by root. `names` keeps only those schemes, `classes` only
+        roots with one of those weakness classes ('regular' for none).
+        With chunk_size, yields lists of up to chunk_size records instead.
+
+        Nothing is kept per root (no derivation memo or root_classes
+        entry), so memory does not grow with the number of roots.
+        """
+        records = MorphEngine._derive_all(roots, schemes, names, classes, is_definite)
+        if not chunk_size:
+            return records
+        return iter(lambda: list(itertools.islice(records, chunk_size)), [])
+
+    @staticmethod
+    def _derive_all(roots, schemes, names, classes, is_definite):
+        """derive_all() body: one record at a time"""
+        if hasattr(schemes, 'candidates'):
+            schemes = schemes.get_all()
+        selected = [(s['name'], s['pattern']) for s in schemes if names is None or s['name'] in names]
+        wanted = set(classes) if classes is not None else None
+        normalize = MorphEngine._normalize
+        for root in roots:
+            # Lines of a roots file still carry their newline
+            root = root.strip()
+            if len(root) != 3:
+                continue
+            root_classes = classify_root(root)
+            if wanted is not None and wanted.isdisjoint(root_classes or ('regular',)):
+                continue
+            for name, pattern in selected:
+                word = MorphEngine._generate(root, pattern, is_definite, root_classes)
+                yield root, name, word, normalize(word)
+
+    @staticmethod
+    def _trace_steps(trace, root, pattern):
+        """Replay the character-by-character build for the tracer only"""
+        c1, c2, c3 = root[0], root[1], root[2]
+        trace(f"   Root letters: c1='{c1}', c2='{c2}', c3='{c3}'")
+        trace(f"   Building word character by character:")
+        result = ""
         for i, char in enumerate(pattern):
             if char == 'ف':
                 result += c1
-                print(f"     Step {i+1}: '{char}' → first letter '{c1}' → result: '{result}'")
+                trace(f"     Step {i+1}: '{char}' → first letter '{c1}' → result: '{result}'")
             elif char == 'ع':
                 result += c2
-                print(f"     Step {i+1}: '{char}' → second letter '{c2}' → result: '{result}'")
+                trace(f"     Step {i+1}: '{char}' → second letter '{c2}' → result: '{result}'")
             elif char == 'ل':
                 result += c3
-                print(f"     Step {i+1}: '{char}' → third letter '{c3}' → result: '{result}'")
+                trace(f"     Step {i+1}: '{char}' → third letter '{c3}' → result: '{result}'")
             else:
                 result += char
-                print(f"     Step {i+1}: '{char}' → keep pattern char → result: '{result}'")
+                trace(f"     Step {i+1}: '{char}' → keep pattern char → result: '{result}'")
+
+    @staticmethod
+    def validate(word, root, schemes, bst, paradigms=None):
+        """Optimized Validation - Two-step process (or one ParadigmIndex probe)"""
+        metrics = MorphEngine.metrics
+        if not metrics.enabled:
+            return MorphEngine._validate(word, root, schemes, bst, paradigms)[:2]
+        started = metrics.sample()
+        is_valid, scheme, path = MorphEngine._validate(word, root, schemes, bst, paradigms)
+        if started is not None:
+            metrics.observe('validate', clock() - started)
+        metrics.incr(f"validate {path} {'hit' if is_valid else 'miss'}")
+        return is_valid, scheme
+
+    @staticmethod
+    def _validate(word, root, schemes, bst, paradigms):
+        """validate() body; also reports the path that answered: paradigm, cache or full"""
+        trace = MorphEngine.tracer
+        if trace:
+            trace(f"\n🟢🟢🟢 validate CALLED 🟢🟢🟢")
+            trace(f"   word: '{word}'")
+            trace(f"   root: '{root}'")
+            trace(f"   schemes: {schemes}")
         
-        print(f"   Basic generation result (before irregularities): '{result}'")
+        # Normalized once here and reused by every comparison below
+        word_without_tashkeel = MorphEngine._normalize(word)
+        # Definiteness as written first; a normalized form starting with ال
+        # may also be indefinite (اِلْتِعَاب from لعب → التعاب), so try both
+        is_def = word.startswith('ال')
+        states = (is_def, not is_def) if word_without_tashkeel.startswith('ال') else (is_def,)
+        if trace:
+            trace(f"   word without tashkeel: '{word_without_tashkeel}'")
         
-        final_result = MorphEngine._handle_irregularities(result, root, pattern, is_definite)
-        print(f"   🔵 FINAL RESULT: '{final_result}'")
-        print(f"🔵🔵🔵 apply_scheme COMPLETED 🔵🔵🔵\n")
+        # Given the SchemeHashTable itself, generate only the schemes its
+        # signature index keeps for this word's shape (3-letter roots)
+        if hasattr(schemes, 'candidates'):
+            ht = schemes
+            if ht.signature is None:
+                ht.index_signatures(MorphEngine.scheme_signature)
+            schemes = ht.get_all()
+            candidates = {d: schemes for d in states}
+            if MorphEngine._covered_by_probes(root, schemes):
+                candidates = {d: ht.candidates(word_without_tashkeel, d) for d in states}
+                if trace:
+                    trace(f"   candidate schemes: {[s['name'] for d in states for s in candidates[d]]}")
+        else:
+            candidates = {d: schemes for d in states}
         
-        return final_result
+        if paradigms is not None and paradigms.covers(root, schemes):
+            # Materialized paradigm: a dict probe instead of generating
+            found = {(name, d) for r, name, d in paradigms.lookup(word, word_without_tashkeel)
+                     if r == root}
+            for d in states:
+                for s in schemes:
+                    if (s['name'], d) in found:
+                        if trace:
+                            trace(f"   ⚡ PARADIGM INDEX HIT: {s['name']} = '{s['pattern']}'")
+                        bst.insert(root, [{"word": word, "pattern": s['name'],
+                                           "normalized": word_without_tashkeel}], cached=True)
+                        return True, s, 'paradigm'
+            if trace:
+                trace(f"   ❌ No match found in paradigm index")
+            return False, None, 'paradigm'
+        
+        cached = bst.find_root_by_word(word, word_without_tashkeel)
+        if trace:
+            trace(f"   cached candidates: {cached}")
+        
+        if any(r == root for r, _ in cached):
+            if trace:
+                trace(f"   ⚡ CACHE HIT! Using fast path")
+            for d in states:
+                for s in candidates[d]:
+                    if trace:
+                        trace(f"     Checking scheme: {s['name']} = '{s['pattern']}'")
+                    generated = MorphEngine.apply_scheme(root, s['pattern'], d)
+                    generated_without = MorphEngine._normalize(generated)
+                    if trace:
+                        trace(f"       generated: '{generated}'")
+                        trace(f"       generated without tashkeel: '{generated_without}'")
+                    if generated_without == word_without_tashkeel or generated == word:
+                        if trace:
+                            trace(f"       ✅ MATCH FOUND in cache path!")
+                        return True, s, 'cache'
 
-    @staticmethod
-    def validate(word, root, schemes, bst):
-        """Optimized Validation - Two-step process"""
-        print(f"\n🟢🟢🟢 validate CALLED 🟢🟢🟢")
-        print(f"   word: '{word}'")
-        print(f"   root: '{root}'")
-        print(f"   schemes: {schemes}")
+        if len(root) != 3:
+            if trace:
+                trace(f"   ❌ Invalid root length")
+            return False, None, 'full'
         
-        word_without_tashkeel = MorphEngine._strip_tashkeel(word)
-        print(f"   word without tashkeel: '{word_without_tashkeel}'")
+        if trace:
+            trace(f"   is_def: {' then '.join(str(d) for d in states)}")
+            trace(f"   🔄 FULL VALIDATION PATH")
         
-        cached_root = bst.find_root_by_word(word)
-        print(f"   cached_root: '{cached_root}'")
+        for d in states:
+            for s in candidates[d]:
+                if trace:
+                    trace(f"     Testing scheme: {s['name']} = '{s['pattern']}'")
+                generated = MorphEngine.apply_scheme(root, s['pattern'], d)
+                generated_without = MorphEngine._normalize(generated)
+                if trace:
+                    trace(f"       generated: '{generated}'")
+                    trace(f"       generated without tashkeel: '{generated_without}'")
+                if generated_without == word_without_tashkeel or generated == word:
+                    if trace:
+                        trace(f"       ✅ MATCH FOUND in full path!")
+                    bst.insert(root, [{"word": word, "pattern": s['name'],
+                                       "normalized": word_without_tashkeel}], cached=True)
+                    if trace:
+                        trace(f"       📝 Added to cache: '{word}' → '{root}'")
+                    return True, s, 'full'
         
-        if cached_root == root:
-            print(f"   ⚡ CACHE HIT! Using fast path")
+        if trace:
+            trace(f"   ❌ No match found")
+        return False, None, 'full'
+
+    @staticmethod
+    def validate_many(pairs, schemes, bst):
+        """
+        validate() for many (word, root) pairs, same answers in input order.
+        Each root's paradigm is generated once (both states) into a
+        normalized form -> first matching scheme table, every word is a dict
+        lookup, and the confirmed derivatives go into the tree in one
+        insert_batch() pass (all of them: validate() skips recording a
+        word its cache already answered).
+        """
+        if hasattr(schemes, 'candidates'):
+            schemes = schemes.get_all()
+        pairs = list(pairs)
+        by_root = {}
+        for i, (word, root) in enumerate(pairs):
+            by_root.setdefault(root, []).append(i)
+
+        results = [None] * len(pairs)
+        confirmed = {}
+        counting = MorphEngine.metrics.enabled
+        for root, indices in by_root.items():
+            if len(root) != 3:
+                # Nothing to tabulate: keep validate()'s own handling
+                for i in indices:
+                    results[i] = MorphEngine.validate(pairs[i][0], root, schemes, bst)
+                continue
+            # A vocalized match is also a normalized one, so the normalized
+            # table alone gives the first matching scheme
+            forms = {False: {}, True: {}}
             for s in schemes:
-                print(f"     Checking scheme: {s['name']} = '{s['pattern']}'")
-                generated = MorphEngine.apply_scheme(root, s['pattern'], word.startswith('ال'))
-                generated_without = MorphEngine._strip_tashkeel(generated)
-                print(f"       generated: '{generated}'")
-                print(f"       generated without tashkeel: '{generated_without}'")
-                if generated_without == word_without_tashkeel or generated == word:
-                    print(f"       ✅ MATCH FOUND in cache path!")
-                    return True, s
+                for is_def, table in forms.items():
+                    table.setdefault(MorphEngine._normalize(MorphEngine.apply_scheme(root, s['pattern'], is_def)), s)
+            for i in indices:
+                word = pairs[i][0]
+                normalized = MorphEngine._normalize(word)
+                # Same states, in the same order, as validate()
+                is_def = word.startswith('ال')
+                s = forms[is_def].get(normalized)
+                if s is None and normalized.startswith('ال'):
+                    s = forms[not is_def].get(normalized)
+                results[i] = (s is not None, s)
+                if s is not None:
+                    confirmed.setdefault(root, []).append({"word": word, "pattern": s['name'],
+                                                           "normalized": normalized})
+                if counting:
+                    MorphEngine.metrics.incr(f"validate batch {'hit' if s is not None else 'miss'}")
+
+        if confirmed:
+            bst.insert_batch(sorted(confirmed.items()), cached=True)
+        return results
+
+
+    # ========== SCHEME PRUNING (SchemeHashTable signatures) ==========
+    @staticmethod
+    def _probes():
+        """Placeholder roots covering every weakness combination (redoubled included)"""
+        options = [(marker,) + _WEAK + _HAMZAS for marker in _MARKERS]
+        for c1 in options[0]:
+            for c2 in options[1]:
+                for c3 in options[2] + ((c2,) if c2 == _MARKERS[1] else ()):
+                    yield c1 + c2 + c3
 
+    @staticmethod
+    def _covered_by_probes(root, schemes):
+        """True if some probe behaves like this root under every rule and scheme"""
         if len(root) != 3:
-            print(f"   ❌ Invalid root length")
-            return False, None
-        
-        is_def = word.startswith('ال')
-        print(f"   is_def: {is_def}")
-        print(f"   🔄 FULL VALIDATION PATH")
-        
+            return False
+        c1, c2, c3 = root
+        for i, letter in enumerate(root):
+            if letter in _ORDINARY:
+                # Ordinary letters may only repeat as c2 == c3 (the redoubled probe)
+                if root.count(letter) > (2 if i and c2 == c3 == letter else 1):
+                    return False
+            elif letter not in _WEAK and letter not in _HAMZAS:
+                return False
+        # The redoubling rule would also merge c2 with the same letter in a pattern
+        if c2 == c3 and c2 in _ORDINARY and any(c2 in s['pattern'] for s in schemes):
+            return False
+        return True
+
+    @staticmethod
+    @functools.lru_cache(maxsize=PATTERN_CACHE_SIZE)
+    def scheme_signature(pattern):
+        """
+        What every normalized form of a pattern has in common, per
+        definiteness: {is_definite: (min length, max length, required)},
+        where `required` holds (position, letter) pairs found in all
+        forms, positions counted from the start (>= 0) or the end (< 0).
+        Computed once per recently used pattern from probe generations.
+        """
+        forms = {}
+        for is_def in (False, True):
+            forms[is_def] = [MorphEngine._normalize(MorphEngine._generate(probe, pattern, is_def))
+                             for probe in MorphEngine._probes()]
+        # A sun-letter first radical swallows the article: the bare form is the indefinite one
+        if pattern.startswith('ف'):
+            forms[True] += forms[False]
+        signature = {}
+        for is_def, bare_forms in forms.items():
+            required = None
+            for bare in bare_forms:
+                letters = {(i, ch) for i, ch in enumerate(bare) if ch not in _MARKERS}
+                letters |= {(i - len(bare), ch) for i, ch in enumerate(bare) if ch not in _MARKERS}
+                required = letters if required is None else required & letters
+            lengths = [len(bare) for bare in bare_forms]
+            signature[is_def] = (min(lengths), max(lengths), tuple(sorted(required)))
+        return signature
+
+    # ========== ROOT-LESS ANALYSIS (skeleton index) ==========
+    @staticmethod
+    def _skeletons(pattern, is_definite):
+        """
+        Consonant skeletons of a pattern, e.g. مَفْعُول → م _ _ و _.
+        Each skeleton is (length, fixed letters by position, radicals), where
+        a radical is either a word position or a weak/hamza letter that the
+        irregularity rules rewrite. One skeleton is derived per weakness
+        combination by generating the pattern with placeholder radicals.
+        A radical after c1 that a rule drops (hollow فَعَلَ keeps only c1)
+        is None; analyze fills it in from the roots in the BST.
+        """
+        skeletons = set()
+        # c2 == c3 == placeholder covers redoubled roots, except those whose
+        # letter also occurs in the pattern (ختت in اِفْتِعَال): the redoubling
+        # merges it with the pattern's letter, so probe with that letter too
+        plain = MorphEngine._normalize(MorphEngine._generate(''.join(_MARKERS), pattern, is_definite))
+        redoubled = [c1 + letter + letter for c1 in (_MARKERS[0],) + _WEAK + _HAMZAS
+                     for letter in sorted(set(plain) & _ORDINARY)]
+        for probe in itertools.chain(MorphEngine._probes(), redoubled):
+            bare = MorphEngine._normalize(
+                MorphEngine._generate(probe, pattern, is_definite))
+            radicals = []
+            for i, letter in enumerate(probe):
+                if letter not in _MARKERS:
+                    radicals.append(letter)
+                    continue
+                spots = [j for j, ch in enumerate(bare) if ch == letter]
+                if len(spots) == 2 and probe.count(letter) == 2:
+                    spots = spots[i - 1:]
+                if not spots:
+                    if not i:
+                        break  # c1 dropped: no prefix to look roots up by
+                    radicals.append(None)
+                    continue
+                radicals.append(spots[0])
+            else:
+                fixed = tuple((i, ch) for i, ch in enumerate(bare) if ch not in _MARKERS)
+                skeletons.add((len(bare), fixed, tuple(radicals)))
+        return skeletons
+
+    @staticmethod
+    def _skeleton_index(schemes):
+        """length -> fixed positions -> fixed letters -> [(scheme, is_definite, radicals)]"""
+        key = tuple((s['name'], s['pattern']) for s in schemes)
+        cached = MorphEngine._skeleton_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        index = {}
         for s in schemes:
-            print(f"     Testing scheme: {s['name']} = '{s['pattern']}'")
-            generated = MorphEngine.apply_scheme(root, s['pattern'], is_def)
-            generated_without = MorphEngine._strip_tashkeel(generated)
-            print(f"       generated: '{generated}'")
-            print(f"       generated without tashkeel: '{generated_without}'")
-            if generated_without == word_without_tashkeel or generated == word:
-                print(f"       ✅ MATCH FOUND in full path!")
-                bst.insert(root, [{"word": word, "pattern": s['name']}])
-                print(f"       📝 Added to cache: '{word}' → '{root}'")
-                return True, s
-        
-        print(f"   ❌ No match found")
-        return False, None
+            for is_def in (False, True):
+                for length, fixed, radicals in MorphEngine._skeletons(s['pattern'], is_def):
+                    positions = tuple(i for i, _ in fixed)
+                    letters = tuple(ch for _, ch in fixed)
+                    by_letters = index.setdefault(length, {}).setdefault(positions, {})
+                    by_letters.setdefault(letters, []).append((s, is_def, radicals))
+        MorphEngine._skeleton_cache = (key, index)
+        return index
+
+    @staticmethod
+    def analyze(word, schemes, bst, normalized=None):
+        """
+        Root-less analysis: every (root, scheme) pair that generates `word`.
+        Radicals are read straight off the matching skeletons and kept only
+        if the root is in the BST and regenerates the word. A radical the
+        pattern drops is taken from the BST roots sharing the known prefix,
+        so قَالَ yields every hollow ق root (the rule writes them all alike).
+        Roots with three identical radicals (ككك) are not found.
+        """
+        trace = MorphEngine.tracer
+        bare = normalized if normalized is not None else MorphEngine._normalize(word)
+        index = MorphEngine._skeleton_index(schemes)
+
+        candidates = []
+        for positions, by_letters in index.get(len(bare), {}).items():
+            entries = by_letters.get(tuple(bare[i] for i in positions))
+            if entries:
+                candidates.extend(entries)
+        # A sun letter swallows the article, leaving the indefinite skeleton
+        if bare and bare[0] in _SUN_LETTERS:
+            candidates.extend((s, True, radicals) for s, is_def, radicals in list(candidates)
+                              if not is_def)
+
+        results = []
+        seen = set()
+        for s, is_def, radicals in candidates:
+            letters = [bare[r] if isinstance(r, int) else r for r in radicals]
+            if None in letters:
+                prefix = "".join(letters[:letters.index(None)])
+                roots = [r for r in bst.roots_with_prefix(prefix)
+                         if all(c is None or r[i] == c for i, c in enumerate(letters))]
+            else:
+                roots = ["".join(letters)]
+            for root in roots:
+                if (root, s['name']) in seen or bst.search(root) is None:
+                    continue
+                generated = MorphEngine.apply_scheme(root, s['pattern'], is_def)
+                if generated == word or MorphEngine._normalize(generated) == bare:
+                    seen.add((root, s['name']))
+                    results.append((root, s))
+                    if trace:
+                        trace(f"   ✅ analyze: '{word}' → {root} + {s['name']} ({s['pattern']})")
+        return results
+
+class ParadigmIndex:
+    """
+    Materialized paradigm: every root × scheme form generated once.
+    Maps each vocalized and undiacritized form (definite and indefinite)
+    to its (root, scheme name, is_definite) entries, and is kept up to
+    date from ArabicBST / SchemeHashTable change events.
+    """
 
+    def __init__(self):
+        self.forms = {}      # form -> [(root, scheme name, is_definite)]
+        self.cells = {}      # (root, scheme name) -> forms it contributed
+        self.roots = set()
+        self.schemes = {}    # scheme name -> pattern
+
+    def attach(self, bst, ht):
+        """Build from the current lexicon, then follow its changes."""
+        for s in ht.get_all():
+            self.schemes[s['name']] = s['pattern']
+        self.add_roots(bst.roots())
+        bst.subscribe(self._on_bst_event)
+        ht.subscribe(self._on_scheme_event)
+        return self
+
+    def _on_bst_event(self, event, root_str):
+        if event == 'root_added':
+            self.add_root(root_str)
+
+    def _on_scheme_event(self, event, name, pattern):
+        if event == 'scheme_added':
+            self.add_scheme(name, pattern)
+        elif event == 'scheme_removed':
+            self.remove_scheme(name)
+
+    # ========== INCREMENTAL MAINTENANCE ==========
+    def _add_cell(self, root, name, pattern, generated=None):
+        """`generated`: the (indefinite, definite) words, when already computed"""
+        if generated is None:
+            generated = [MorphEngine._generate(root, pattern, is_def) for is_def in (False, True)]
+        forms = []
+        for is_def, word in zip((False, True), generated):
+            for form in (word, MorphEngine._normalize(word)):
+                entry = (root, name, is_def)
+                entries = self.forms.setdefault(form, [])
+                if entry not in entries:
+                    entries.append(entry)
+                    forms.append(form)
+        self.cells[(root, name)] = tuple(forms)
+
+    def _drop_cell(self, root, name):
+        for form in self.cells.pop((root, name), ()):
+            entries = self.forms.get(form)
+            if entries is None:
+                continue
+            entries[:] = [e for e in entries if e[0] != root or e[1] != name]
+            if not entries:
+                del self.forms[form]
+
+    def add_root(self, root):
+        """O(schemes): materialize the new root's paradigm."""
+        if root in self.roots or len(root) != 3:
+            return
+        self.roots.add(root)
+        for name, pattern in self.schemes.items():
+            self._add_cell(root, name, pattern)
+
+    def add_roots(self, roots):
+        """
+        add_root() for many roots. With NumPy available, each scheme column
+        is generated for all of them at once (logic_vector); same result.
+        """
+        new = [root for root in dict.fromkeys(roots) if root not in self.roots and len(root) == 3]
+        if not new:
+            return
+        try:
+            from logic_vector import VectorEngine
+        except ImportError:
+            for root in new:
+                self.add_root(root)
+            return
+        engine = VectorEngine(new)
+        columns = [(name, pattern, engine.generate(pattern, False).tolist(), engine.generate(pattern, True).tolist())
+                   for name, pattern in self.schemes.items()]
+        for i, root in enumerate(new):
+            self.roots.add(root)
+            for name, pattern, indefinite, definite in columns:
+                self._add_cell(root, name, pattern, (indefinite[i], definite[i]))
+
+    def add_scheme(self, name, pattern):
+        """O(roots): materialize (or re-materialize) one scheme column."""
+        if name in self.schemes:
+            self.remove_scheme(name)
+        self.schemes[name] = pattern
+        for root in self.roots:
+            self._add_cell(root, name, pattern)
+
+    def remove_scheme(self, name):
+        """O(roots): drop one scheme column."""
+        if self.schemes.pop(name, None) is None:
+            return
+        for root in self.roots:
+            self._drop_cell(root, name)
+
+    # ========== QUERIES ==========
+    def lookup(self, word, normalized=None):
+        """All (root, scheme name, is_definite) entries producing `word`."""
+        exact = self.forms.get(word, [])
+        bare = self.forms.get(normalized if normalized is not None else MorphEngine._normalize(word), [])
+        if not exact or exact is bare:
+            return bare
+        return exact + [e for e in bare if e not in exact]
+
+    def covers(self, root, schemes):
+        """True if the index holds this root under exactly these schemes."""
+        if root not in self.roots:
+            return False
+        for s in schemes:
+            if self.schemes.get(s['name']) != s['pattern']:
+                return False
+        return True
+
+    def memory_report(self):
+        """Approximate resident size of the index, in bytes."""
+        forms_bytes = sys.getsizeof(self.forms)
+        entries = 0
+        for form, items in self.forms.items():
+            forms_bytes += sys.getsizeof(form) + sys.getsizeof(items)
+            forms_bytes += sum(sys.getsizeof(e) for e in items)
+            entries += len(items)
+        cells_bytes = sys.getsizeof(self.cells)
+        for key, forms in self.cells.items():
+            cells_bytes += sys.getsizeof(key) + sys.getsizeof(forms)
+        total = forms_bytes + cells_bytes + sys.getsizeof(self.roots)
+        return {
+            "roots": len(self.roots),
+            "schemes": len(self.schemes),
+            "forms": len(self.forms),
+            "entries": entries,
+            "forms_bytes": forms_bytes,
+            "cells_bytes": cells_bytes,
+            "total_bytes": total,
+            "bytes_per_root": total // len(self.roots) if self.roots else 0,
+        }
+
+
+def metrics_snapshot(bst=None, ht=None):
+    """
+    One JSON document with every runtime metric: engine rule counters,
+    validate paths and latencies, plus tree and scheme-table stats.
+    """
+    snapshot = {"engine": MorphEngine.metrics_snapshot()}
+    if bst is not None:
+        snapshot["bst"] = bst.stats()
+    if ht is not None:
+        snapshot["schemes"] = ht.stats()
+    return json.dumps(snapshot, ensure_ascii=False, indent=2)
+
+
+def changes_since(bst, ht, bst_version=0, ht_version=0):
+    """
+    One compact JSON delta for the UI: roots, derivatives and scheme
+    edits made since the given ArabicBST / SchemeHashTable versions.
+    """
+    return json.dumps({
+        "bst": bst.changes_since(bst_version),
+        "schemes": ht.changes_since(ht_version),
+    }, ensure_ascii=False, separators=(',', ':'))
 
 if __name__ == "__main__":
     print("=" * 60)
     print("🧪 TESTING MORPHOLOGICAL ENGINE WITH LOGS")
     print("=" * 60)
-    
-    # Test cases
-    tests = [
-        ("كتب", "فَاعِل", "كَاتِب"),
-        ("قرأ", "فَاعِل", "قَارِئ"),
-        ("قرأ", "اِسْتِفْعَال", "اِسْتِقْرَاء"),  # Your pattern with kasra
-        ("قول", "فَاعِل", "قَائِل"),
-        ("عمل", "فَاعِل", "عَامِل"),
-    ]
-    
-    for root, pattern, expected in tests:
-        print(f"\n{'='*50}")
-        print(f"TEST: {root} + {pattern}")
-        print(f"{'='*50}")
-        result = MorphEngine.apply_scheme(root, pattern, False)
-        status = "✅" if result == expected else "❌"
-        print(f"\n{status} RESULT: '{result}' (expected: '{expected}')")
\ No newline at end of file
+    # The web UI runs this file in Pyodide's __main__: the tracer must not
+    # outlive the demo, or every later derivation prints and skips the memo
+    MorphEngine.set_tracer(print)
+    try:
+        # Test cases
+        tests = [
+            ("كتب", "فَاعِل", "كَاتِب"),
+            ("قرأ", "فَاعِل", "قَارِئ"),
+            ("قرأ", "اِسْتِفْعَال", "اِسْتِقْرَاء"),  # Your pattern with kasra
+            ("قول", "فَاعِل", "قَائِل"),
+            ("عمل", "فَاعِل", "عَامِل"),
+        ]
+
+        for root, pattern, expected in tests:
+            print(f"\n{'='*50}")
+            print(f"TEST: {root} + {pattern}")
+            print(f"{'='*50}")
+            result = MorphEngine.apply_scheme(root, pattern, False)
+            status = "✅" if result == expected else "❌"
+            print(f"\n{status} RESULT: '{result}' (expected: '{expected}')")
+    finally:
+        MorphEngine.set_tracer(None)
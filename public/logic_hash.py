@@ -1,81 +1,266 @@
+from logic_symbols import SYMBOLS
+
 
 class SchemeHashTable:
+    # Change-log entries kept for changes_since before older ones are dropped
+    CHANGELOG_LIMIT = 1000
+
+    # Grow once the average chain length passes this
+    MAX_LOAD_FACTOR = 0.75
+
     def __init__(self, size=31):
         # Using 31 as specified in the report (optimal prime number)
         self.size = size
         self.table = [[] for _ in range(size)]
-    def get_full_structure(self):
-        """Return the entire hash table structure for visualization."""
+        self.count = 0
+        # Cached get_all() snapshot, rebuilt only after a change
+        self._all = None
+        # Telemetry: chain entries compared by get(), and rehash count
+        self.lookups = 0
+        self.probes = 0
+        self.resizes = 0
+        # Callbacks notified as listener(event, name, pattern) on every change
+        self.listeners = []
+        # Monotonic version and (version, op, name, pattern, bucket) change log
+        self.version = 0
+        self.changelog = []
+        self.changelog_floor = 0
+        # Shared intern pool: names and patterns are stored once and
+        # referenced by id from ArabicBST derivatives
+        self.symbols = SYMBOLS
+        # Candidate index for validate: (is_definite, length) -> {name: (pattern, required
+        # letters)}, filled from a signature function (see index_signatures)
+        self.signature = None
+        self.by_shape = {}
+        self._order = None  # name -> position in get_all(), rebuilt with it
+        # Frozen: get() stops counting lookups (see freeze)
+        self.frozen = False
+
+    def copy(self):
+        """
+        Independent, writable table with the same schemes, version and
+        signature index. Listeners stay with this table.
+        """
+        clone = SchemeHashTable.__new__(SchemeHashTable)
+        clone.__dict__.update(self.__dict__)
+        clone.table = [list(bucket) for bucket in self.table]
+        clone.lookups = clone.probes = 0
+        clone.frozen = False
+        clone.listeners = []
+        clone.changelog = list(self.changelog)
+        clone.by_shape = {key: dict(shapes) for key, shapes in self.by_shape.items()}
+        return clone
+
+    def freeze(self):
+        """
+        Make reads side-effect free, for a table read from several threads
+        and never written again: the lazy get_all() snapshot and candidate
+        order are built now, and get() stops counting lookups.
+        """
+        self.get_all()
+        if self._order is None:
+            self._order = {s['name']: i for i, s in enumerate(self._all)}
+        self.frozen = True
+
+    def subscribe(self, listener):
+        """Register a callback for 'scheme_added' / 'scheme_removed' events."""
+        self.listeners.append(listener)
+
+    def _notify(self, event, name, pattern):
+        self.version += 1
+        op = 'add' if event == 'scheme_added' else 'remove'
+        self.changelog.append((self.version, op, name, pattern, self._hash(name)))
+        if len(self.changelog) > self.CHANGELOG_LIMIT:
+            drop = len(self.changelog) // 2
+            self.changelog_floor = self.changelog[drop - 1][0]
+            del self.changelog[:drop]
+        for listener in self.listeners:
+            listener(event, name, pattern)
+
+    def changes_since(self, version):
+        """Scheme edits after `version` as [op, name, pattern, bucket] rows, O(changes)."""
+        if version < self.changelog_floor or version > self.version:
+            return {"version": self.version, "full": True}
+        edits = [[op, n, p, b] for _, op, n, p, b in self.changelog[version - self.changelog_floor:]]
+        return {"version": self.version, "edits": edits}
+
+    def get_full_structure(self, include_stats=False):
+        """
+        Return the entire hash table structure for visualization;
+        with include_stats, wrap it as {"buckets": ..., "stats": stats()}.
+        """
         result = []
         for bucket in self.table:
             items = []
             for n, p in bucket:
                 items.append({"name": n, "pattern": p})
             result.append(items)
+        if include_stats:
+            return {"buckets": result, "stats": self.stats()}
         return result
+
+    def stats(self):
+        """Load factor, bucket-length distribution and probe counts."""
+        lengths = [len(bucket) for bucket in self.table]
+        histogram = {}
+        for length in lengths:
+            histogram[length] = histogram.get(length, 0) + 1
+        return {
+            "size": self.size,
+            "count": self.count,
+            "load_factor": self.count / self.size,
+            "max_bucket": max(lengths) if lengths else 0,
+            "bucket_lengths": {str(k): v for k, v in sorted(histogram.items())},
+            "lookups": self.lookups,
+            "probes": self.probes,
+            "avg_probes": self.probes / self.lookups if self.lookups else 0.0,
+            "resizes": self.resizes,
+        }
+
     def _hash(self, key):
         """
-        STEP 2: Hash function from the report.
-        Sum of ord(char) % 31.
-        Complexity: O(1)
+        STEP 2: Hash function.
+        32-bit FNV-1a over the code points, with a final fold of the high
+        bits, so anagrams and equal-sum Arabic names land in different buckets.
+        Complexity: O(len(key))
         """
-        total = sum(ord(char) for char in key)
-        return total % self.size
+        h = 0x811C9DC5
+        for char in key:
+            h = ((h ^ ord(char)) * 0x01000193) & 0xFFFFFFFF
+        h ^= h >> 16
+        return h % self.size
+
+    def _resize(self, new_size):
+        """Rehash every entry into `new_size` buckets (a prime)."""
+        entries = [item for bucket in self.table for item in bucket]
+        self.size = new_size
+        self.table = [[] for _ in range(new_size)]
+        for name, pattern in entries:
+            self.table[self._hash(name)].append((name, pattern))
+        self.resizes += 1
+        self._all = None
+        # Bucket indices in the change log are stale: force a full resync
+        self.version += 1
+        self.changelog = []
+        self.changelog_floor = self.version
+
+    @staticmethod
+    def _next_prime(n):
+        n |= 1
+        while any(n % d == 0 for d in range(3, int(n ** 0.5) + 1, 2)):
+            n += 2
+        return n
 
     def insert(self, name, pattern):
+        name, pattern = self.symbols.canonical(name), self.symbols.canonical(pattern)
         index = self._hash(name)
         bucket = self.table[index]
         for i, (n, p) in enumerate(bucket):
             if n == name:
                 bucket[i] = (name, pattern)
+                if p != pattern:
+                    self._all = None
+                    self._unindex(name)
+                    self._index(name, pattern)
+                    self._notify('scheme_removed', name, p)
+                    self._notify('scheme_added', name, pattern)
                 return
         bucket.append((name, pattern))
+        self.count += 1
+        self._all = None
+        self._index(name, pattern)
+        if self.count > self.MAX_LOAD_FACTOR * self.size:
+            self._resize(self._next_prime(2 * self.size))
+        self._notify('scheme_added', name, pattern)
 
     def get(self, name):
         """Direct access O(1) to scheme pattern."""
         index = self._hash(name)
+        counting = not self.frozen
+        if counting:
+            self.lookups += 1
         for n, p in self.table[index]:
+            if counting:
+                self.probes += 1
             if n == name:
                 return p
         return None
 
     def get_all(self):
-        all_schemes = []
+        """All schemes in bucket order; a cached snapshot, rebuilt only after changes."""
+        if self._all is None:
+            all_schemes = []
+            for bucket in self.table:
+                for n, p in bucket:
+                    all_schemes.append({"name": n, "pattern": p})
+            self._all = all_schemes
+            self._order = None
+        return self._all
+
+    # ========== CANDIDATE INDEX (validate pruning) ==========
+    def index_signatures(self, signature):
+        """
+        Index every scheme by signature(pattern), which returns
+        {is_definite: (min length, max length, required)} with `required`
+        the (position, letter) pairs all its undiacritized forms share
+        (negative positions count from the end). Kept current on
+        insert / remove from then on.
+        """
+        self.signature = signature
+        self.by_shape = {}
         for bucket in self.table:
-            for n, p in bucket:
-                all_schemes.append({"name": n, "pattern": p})
-        return all_schemes
-  # Add these methods to the SchemeHashTable class:
-
-def get_full_structure(self):
-    """Return entire hash table for visualization."""
-    result = []
-    for bucket in self.table:
-        items = []
-        for n, p in bucket:
-            items.append({"name": n, "pattern": p})
-        result.append(items)
-    return result
-
-def remove(self, name):
-    """Remove a scheme by name."""
-    index = self._hash(name)
-    # Create a new bucket without the scheme to remove
-    new_bucket = []
-    for item in self.table[index]:
-        if item[0] != name:  # item[0] is the name, item[1] is the pattern
-            new_bucket.append(item)
-    self.table[index] = new_bucket
-    return True  # Return success
-def update(self, old_name, new_name, new_pattern):
-    """Update an existing scheme."""
-    self.remove(old_name)
-    self.insert(new_name, new_pattern)
-    
-def get_scheme_names(self):
-    """Get all scheme names."""
-    names = []
-    for bucket in self.table:
-        for n, p in bucket:
-            names.append(n)
-    return names
\ No newline at end of file
+            for name, pattern in bucket:
+                self._index(name, pattern)
+
+    def _index(self, name, pattern):
+        if self.signature is None:
+            return
+        for is_def, (low, high, required) in self.signature(pattern).items():
+            for length in range(low, high + 1):
+                self.by_shape.setdefault((is_def, length), {})[name] = (pattern, required)
+
+    def _unindex(self, name):
+        for key in [key for key, shapes in self.by_shape.items() if name in shapes]:
+            del self.by_shape[key][name]
+            if not self.by_shape[key]:
+                del self.by_shape[key]
+
+    def candidates(self, word, is_definite):
+        """
+        Schemes that can produce the undiacritized `word`, in get_all()
+        order: its length is in range and every required letter is there.
+        Without a signature function, every scheme is a candidate.
+        """
+        if self.signature is None:
+            return self.get_all()
+        shapes = self.by_shape.get((is_definite, len(word)))
+        if not shapes:
+            return []
+        survivors = [name for name, (_, required) in shapes.items()
+                     if all(word[i] == ch for i, ch in required)]
+        if self._order is None:
+            self._order = {s['name']: i for i, s in enumerate(self.get_all())}
+        survivors.sort(key=self._order.__getitem__)
+        return [{"name": name, "pattern": shapes[name][0]} for name in survivors]
+
+    def remove(self, name):
+        """Remove a scheme by name (O(1) average: one bucket)."""
+        bucket = self.table[self._hash(name)]
+        for i, (n, p) in enumerate(bucket):
+            if n == name:
+                del bucket[i]
+                self.count -= 1
+                self._all = None
+                self._unindex(name)
+                self._notify('scheme_removed', n, p)
+                return True
+        return False
+
+    def update(self, old_name, new_name, new_pattern):
+        """Update an existing scheme."""
+        self.remove(old_name)
+        self.insert(new_name, new_pattern)
+
+    def get_scheme_names(self):
+        """Get all scheme names."""
+        return [s['name'] for s in self.get_all()]
@@ -0,0 +1,99 @@
+import time
+
+# Monotonic high-resolution clock used for every latency sample
+clock = time.perf_counter
+
+
+class LatencyHistogram:
+    """
+    Latency distribution in power-of-two microsecond buckets:
+    bucket i counts samples under 2**i µs (bucket 0: under 1 µs).
+    Recording is an int conversion and a list increment.
+    """
+    BUCKETS = 32
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        i = int(seconds * 1e6).bit_length()
+        self.buckets[i if i < self.BUCKETS else self.BUCKETS - 1] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound (µs) of the bucket holding the q-quantile."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return 1 << i
+        return 0
+
+    def reset(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total * 1e6 / self.count if self.count else 0.0,
+            "max_us": self.max * 1e6,
+            "p50_us": self.percentile(0.5),
+            "p90_us": self.percentile(0.9),
+            "p99_us": self.percentile(0.99),
+            "buckets": {f"<{1 << i}us": n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Metrics:
+    """
+    Named counters and latency histograms. Counters are exact; latency is
+    sampled on one call in `sample_every` so that hot paths only pay for
+    a tick and a modulo. Disabling it turns every instrumented call site
+    into a single attribute check.
+    """
+    def __init__(self, enabled=True, sample_every=1):
+        self.enabled = enabled
+        self.sample_every = sample_every
+        self.ticks = 0
+        self.counters = {}
+        self.histograms = {}
+
+    def sample(self):
+        """Start time if this call should be timed, else None."""
+        if not self.enabled:
+            return None
+        self.ticks += 1
+        return clock() if self.ticks % self.sample_every == 0 else None
+
+    def incr(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def reset(self):
+        """Zero everything in place (histograms keep their identity)."""
+        self.counters.clear()
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def snapshot(self):
+        return {
+            "enabled": self.enabled,
+            "sample_every": self.sample_every,
+            "counters": dict(sorted(self.counters.items())),
+            "latency": {name: h.snapshot() for name, h in sorted(self.histograms.items())},
+        }
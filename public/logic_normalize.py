@@ -0,0 +1,48 @@
+"""
+Arabic normalization on precompiled str.translate tables: one C-level
+pass per string, whatever the combination of steps.
+"""
+
+# Profile flags, combined with |
+STRIP_TASHKEEL = 1   # drop harakat, tanwin, shadda, sukun (U+064B..U+0652)
+REMOVE_TATWEEL = 2   # drop the kashida (U+0640)
+FOLD_HAMZA = 4       # أ إ آ -> ا, ؤ ئ -> ء
+UNIFY_YA = 8         # ى (alef maqsura) -> ي
+
+# Named profiles: diacritics only; comparing and indexing forms;
+# most lenient (hamza seats ignored too)
+BARE = STRIP_TASHKEEL
+MATCH = STRIP_TASHKEEL | REMOVE_TATWEEL | UNIFY_YA
+SEARCH = MATCH | FOLD_HAMZA
+
+_STEPS = {
+    STRIP_TASHKEEL: {chr(c): None for c in range(0x064B, 0x0653)},
+    REMOVE_TATWEEL: {'ـ': None},
+    FOLD_HAMZA: {'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ؤ': 'ء', 'ئ': 'ء'},
+    UNIFY_YA: {'ى': 'ي'},
+}
+
+# profile -> translate table, every combination built up front
+_TABLES = {}
+for _profile in range(1 << len(_STEPS)):
+    _mapping = {}
+    for _flag, _step in _STEPS.items():
+        if _profile & _flag:
+            _mapping.update(_step)
+    _TABLES[_profile] = str.maketrans(_mapping)
+
+
+def table(profile):
+    """The precompiled translate table for a profile."""
+    return _TABLES[profile]
+
+
+def normalize(text, profile=MATCH):
+    """Normalize one string in a single pass."""
+    return text.translate(_TABLES[profile])
+
+
+def normalize_many(texts, profile=MATCH):
+    """Normalize a batch of strings, resolving the table once."""
+    mapping = _TABLES[profile]
+    return [text.translate(mapping) for text in texts]
@@ -0,0 +1,141 @@
+import threading
+from collections import namedtuple
+
+from logic_engine import MorphEngine
+
+# One published state of the lexicon. Never modified once published:
+# readers keep using the version they picked up for as long as they like.
+LexiconVersion = namedtuple('LexiconVersion', 'version bst ht')
+
+
+class _DeferredWrites:
+    """
+    The `bst` handed to MorphEngine.validate in shared mode: reads go to
+    a published version, inserts are queued for the next batch.
+    """
+    def __init__(self, lexicon, view):
+        self.lexicon = lexicon
+        self.view = view
+
+    def find_root_by_word(self, word, normalized=None):
+        return self.view.bst.find_root_by_word(word, normalized)
+
+    def insert(self, root_str, derivatives=None, cached=False):
+        self.lexicon.insert_root(root_str, derivatives, cached)
+
+    def insert_batch(self, groups, cached=False):
+        for root_str, derivatives in groups:
+            self.lexicon.insert_root(root_str, derivatives, cached)
+
+
+class SharedLexicon:
+    """
+    ArabicBST + SchemeHashTable shared between threads.
+
+    Readers call view() (or the read helpers below) and work on an
+    immutable LexiconVersion without taking any lock. Writers only
+    append to a queue; publish() copies the current version (nodes are
+    shared, only the paths an insert walks are cloned), applies the
+    whole batch to the copy and swaps it in with a single assignment,
+    so a reader sees either all of a batch or none of it.
+
+    The bst and ht passed in become version 1 and are frozen (reads
+    there no longer update counters or recency); later versions do not
+    notify the listeners subscribed to them.
+    """
+    def __init__(self, bst, ht, batch_size=256):
+        self.batch_size = batch_size
+        self._view = self._prepared(LexiconVersion(1, bst, ht))
+        self._pending = []
+        self._queue_lock = threading.Lock()    # guards _pending only
+        self._publish_lock = threading.Lock()  # one batch applied at a time
+        self.published = 0
+        self.applied = 0
+
+    # ========== READERS (lock-free) ==========
+    def view(self):
+        """The latest published version."""
+        return self._view
+
+    def search(self, root_str):
+        return self._view.bst.search(root_str)
+
+    def find_root_by_word(self, word, normalized=None):
+        return self._view.bst.find_root_by_word(word, normalized)
+
+    def get_all(self):
+        return self._view.ht.get_all()
+
+    def to_dict(self):
+        return self._view.bst.to_dict()
+
+    def validate(self, word, root, paradigms=None):
+        """MorphEngine.validate on the latest version; a match is cached by the next batch."""
+        view = self._view
+        return MorphEngine.validate(word, root, view.ht, _DeferredWrites(self, view), paradigms)
+
+    def validate_many(self, pairs):
+        """MorphEngine.validate_many on the latest version; matches are cached by the next batch."""
+        view = self._view
+        return MorphEngine.validate_many(pairs, view.ht, _DeferredWrites(self, view))
+
+    # ========== WRITERS (batched) ==========
+    def insert_root(self, root_str, derivatives=None, cached=False):
+        self._enqueue(('insert', root_str, derivatives, cached))
+
+    def insert_scheme(self, name, pattern):
+        self._enqueue(('scheme', name, pattern, False))
+
+    def remove_scheme(self, name):
+        self._enqueue(('remove', name, None, False))
+
+    def _enqueue(self, op):
+        with self._queue_lock:
+            self._pending.append(op)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.publish()
+
+    def publish(self):
+        """Apply every queued write to a copy and make it the current version."""
+        with self._publish_lock:
+            with self._queue_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return self._view
+            current = self._view
+            bst = current.bst.copy()
+            ht = current.ht
+            if any(op != 'insert' for op, _, _, _ in batch):
+                ht = ht.copy()
+            for op, key, value, cached in batch:
+                if op == 'insert':
+                    bst.insert(key, value, cached)
+                elif op == 'scheme':
+                    ht.insert(key, value)
+                else:
+                    ht.remove(key)
+            self._view = self._prepared(LexiconVersion(current.version + 1, bst, ht))
+            self.published += 1
+            self.applied += len(batch)
+            return self._view
+
+    @staticmethod
+    def _prepared(view):
+        """Do the lazy work a reader would otherwise do (and race on) up front, then freeze."""
+        if view.ht.signature is None:
+            view.ht.index_signatures(MorphEngine.scheme_signature)
+        view.ht.freeze()
+        view.bst.freeze()
+        return view
+
+    def stats(self):
+        with self._queue_lock:
+            pending = len(self._pending)
+        return {
+            "version": self._view.version,
+            "published": self.published,
+            "applied": self.applied,
+            "pending": pending,
+            "batch_size": self.batch_size,
+        }
@@ -0,0 +1,143 @@
+import mmap
+import os
+import struct
+
+from logic_bst import ArabicBST, CompactInverseIndex
+from logic_hash import SchemeHashTable
+
+# File layout (little-endian):
+#   header       MAGIC, then <IIIII: strings, roots, derivatives, schemes, flags
+#   offsets      (strings + 1) uint32 byte offsets into the string blob
+#   blob         UTF-8 strings back to back (string i = blob[off[i]:off[i+1]])
+#   roots        uint32 string ids, sorted
+#   derivatives  (root index, word id, pattern id) uint32 triples, grouped by root
+#   schemes      (name id, pattern id) uint32 pairs, in get_all() order
+MAGIC = b'MMSNAP01'
+_HEADER = struct.Struct('<IIIII')
+_NO_STRING = 0xFFFFFFFF
+_FLAG_FOLD_HAMZA = 1
+_FLAG_COMPACT_INDEX = 2
+
+
+def save_snapshot(path, bst, ht):
+    """Write the roots, derivatives and schemes to a compact binary file."""
+    ids = {}
+    strings = []
+
+    def intern(text):
+        if text is None:
+            return _NO_STRING
+        sid = ids.get(text)
+        if sid is None:
+            sid = ids[text] = len(strings)
+            strings.append(text.encode('utf-8'))
+        return sid
+
+    roots, derivatives = [], []
+    for i, node in enumerate(bst.inorder()):
+        roots.append(intern(node.root))
+        for d in node.derivatives:
+            derivatives.extend((i, intern(d['word']), intern(d.get('pattern'))))
+    schemes = []
+    for s in ht.get_all():
+        schemes.extend((intern(s['name']), intern(s['pattern'])))
+
+    offsets = [0]
+    for encoded in strings:
+        offsets.append(offsets[-1] + len(encoded))
+    flags = _FLAG_FOLD_HAMZA if bst.inverse_index.fold_hamza else 0
+    if isinstance(bst.inverse_index, CompactInverseIndex):
+        flags |= _FLAG_COMPACT_INDEX
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_HEADER.pack(len(strings), len(roots), len(derivatives) // 3, len(schemes) // 2, flags))
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        f.write(b''.join(strings))
+        for table in (roots, derivatives, schemes):
+            f.write(struct.pack(f'<{len(table)}I', *table))
+    # Atomic replace so a crash never leaves a half-written snapshot
+    os.replace(tmp_path, path)
+
+
+class SnapshotReader:
+    """
+    Memory-mapped view of a snapshot. Strings are decoded lazily, on first
+    access, so reading a few roots does not touch the rest of the file.
+    """
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a lexicon snapshot")
+        pos = len(MAGIC)
+        (self.string_count, self.root_count, self.derivative_count,
+         self.scheme_count, self.flags) = _HEADER.unpack_from(self._map, pos)
+        pos += _HEADER.size
+        self._offsets = memoryview(self._map)[pos:pos + 4 * (self.string_count + 1)].cast('I')
+        pos += 4 * (self.string_count + 1)
+        self._blob_start = pos
+        pos += self._offsets[self.string_count]
+        self._roots = memoryview(self._map)[pos:pos + 4 * self.root_count].cast('I')
+        pos += 4 * self.root_count
+        self._derivatives = memoryview(self._map)[pos:pos + 12 * self.derivative_count].cast('I')
+        pos += 12 * self.derivative_count
+        self._schemes = memoryview(self._map)[pos:pos + 8 * self.scheme_count].cast('I')
+        self._decoded = {}
+
+    def string(self, sid):
+        """Decode string `sid` on first use and memoize it."""
+        if sid == _NO_STRING:
+            return None
+        text = self._decoded.get(sid)
+        if text is None:
+            start = self._blob_start + self._offsets[sid]
+            end = self._blob_start + self._offsets[sid + 1]
+            text = self._decoded[sid] = self._map[start:end].decode('utf-8')
+        return text
+
+    def roots(self):
+        for i in range(self.root_count):
+            yield self.string(self._roots[i])
+
+    def derivatives(self):
+        """(root, {"word", "pattern"}) pairs in stored order."""
+        d = self._derivatives
+        for i in range(0, 3 * self.derivative_count, 3):
+            yield self.string(self._roots[d[i]]), {"word": self.string(d[i + 1]), "pattern": self.string(d[i + 2])}
+
+    def schemes(self):
+        s = self._schemes
+        for i in range(0, 2 * self.scheme_count, 2):
+            yield self.string(s[i]), self.string(s[i + 1])
+
+    def close(self):
+        # Views must be released before the map can be closed
+        for view in ('_offsets', '_roots', '_derivatives', '_schemes'):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_snapshot(path):
+    """Rebuild (ArabicBST, SchemeHashTable) from a snapshot with an O(n) tree build."""
+    with SnapshotReader(path) as reader:
+        derivatives = {}
+        for root_str, d in reader.derivatives():
+            derivatives.setdefault(root_str, []).append(d)
+        bst = ArabicBST.from_sorted(list(reader.roots()), derivatives,
+                                    fold_hamza=bool(reader.flags & _FLAG_FOLD_HAMZA),
+                                    compact_index=bool(reader.flags & _FLAG_COMPACT_INDEX))
+        ht = SchemeHashTable()
+        for name, pattern in reader.schemes():
+            ht.insert(name, pattern)
+    return bst, ht
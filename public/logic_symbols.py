@@ -0,0 +1,33 @@
+class SymbolTable:
+    """
+    Intern pool: every distinct string is stored once and gets a small
+    int id. SchemeHashTable interns scheme names and patterns here, and
+    ArabicBST derivatives refer to them by id instead of by string.
+    """
+    def __init__(self):
+        self.strings = []  # id -> string
+        self.ids = {}      # string -> id
+
+    def intern(self, text):
+        """Id of `text`, added on first use (None stays None)."""
+        if text is None:
+            return None
+        sid = self.ids.get(text)
+        if sid is None:
+            sid = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+        return sid
+
+    def lookup(self, sid):
+        return None if sid is None else self.strings[sid]
+
+    def canonical(self, text):
+        """The pooled copy of `text`, so equal strings share one object."""
+        return self.lookup(self.intern(text))
+
+    def __len__(self):
+        return len(self.strings)
+
+
+# Process-wide pool shared by every scheme table and tree
+SYMBOLS = SymbolTable()
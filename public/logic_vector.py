@@ -0,0 +1,196 @@
+"""
+Columnar paradigm generation with NumPy >= 2.3 (optional dependency: import this
+module only where numpy is available).
+
+N roots are held as an N x 3 array of code points. A pattern compiles to
+the positions of its literal letters and of its root slots, so one scheme
+over every root is two array assignments; the rows are then read back as
+fixed-width strings without a per-character loop. Irregular roots are
+grouped by weakness classes and each group goes through the same rule
+plan as MorphEngine, as masked passes over string arrays (np.strings).
+"""
+import numpy as np
+
+# np.strings (NumPy 2.0) and np.strings.slice (2.3) do the masked rewrites:
+# an older NumPy counts as none, so callers fall back on ImportError
+if not hasattr(getattr(np, 'strings', None), 'slice'):
+    raise ImportError(f"logic_vector needs NumPy >= 2.3 (np.strings.slice), found {np.__version__}")
+
+from logic_engine import (
+    _HAMZAS, _RULES, _SLOTS, _SUN_LETTERS, _WEAK, ASSIMILATED, DEFECTIVE,
+    HAMZA_1, HAMZA_2, HAMZA_3, HOLLOW, MorphEngine,
+)
+
+S = np.strings
+
+_ALEF, _LAM, _SHADDA = ord('ا'), ord('ل'), ord('ّ')
+_ARTICLE_HAMZAS = np.array([ord(c) for c in 'أإآ'], dtype=np.uint32)
+_SUN_CODES = np.array(sorted(ord(c) for c in _SUN_LETTERS), dtype=np.uint32)
+_IRREGULAR_CODES = np.array([ord(c) for c in _WEAK + _HAMZAS], dtype=np.uint32)
+
+
+def _third_hamza_ifti3al(w, c1, c2, c3):
+    return np.where(S.endswith(w, 'اأ'), S.add(S.slice(w, 0, -2), 'اء'), S.replace(w, c3, 'اء'))
+
+
+def _third_hamza_istif3al(w, c1, c2, c3):
+    return np.where(S.endswith(w, 'اأ'), S.add(S.slice(w, 0, -2), 'اء'),
+                    np.where(S.endswith(w, 'أ'), S.add(S.slice(w, 0, -1), 'ء'), S.replace(w, 'أ', 'ء')))
+
+
+# Array forms of logic_engine._RULES, same keys; w and c1..c3 are string
+# arrays over one group of rows. Rules missing here (the redoubling regex)
+# run the scalar rule row by row.
+_VECTOR_RULES = {
+    (HOLLOW, 'فَاعِل'): lambda w, c1, c2, c3: S.replace(w, S.add('َا', c2), 'َائ'),
+    (HOLLOW, 'فَعَلَ'): lambda w, c1, c2, c3: S.add(c1, 'َالَ'),
+    (HOLLOW, 'يَفْعَلُ'): lambda w, c1, c2, c3: S.replace(w, c2, 'ُو'),
+    (HOLLOW, 'مَفْعُول'): lambda w, c1, c2, c3: S.replace(w, c2, 'ُو'),
+    (HOLLOW, 'اِفْتِعَال'): lambda w, c1, c2, c3: S.replace(w, S.add('ت', c2), 'تِي'),
+    (HOLLOW, 'اِسْتِفْعَال'): lambda w, c1, c2, c3: S.replace(w, S.add('ت', c2), 'تِي'),
+
+    (HAMZA_1, 'فَاعِل'): lambda w, c1, c2, c3: S.replace(w, 'أَأ', 'آ'),
+    (HAMZA_1, 'اِفْتِعَال'): lambda w, c1, c2, c3: S.replace(w, 'ائ', 'ئ'),
+    (HAMZA_1, 'اِسْتِفْعَال'): lambda w, c1, c2, c3: S.replace(w, 'ائ', 'ئ'),
+
+    (HAMZA_2, 'فَاعِل'): lambda w, c1, c2, c3: S.replace(w, S.add('ا', c2), 'ائ'),
+    (HAMZA_2, 'مَفْعُول'): lambda w, c1, c2, c3: S.replace(w, c2, 'ؤ'),
+    (HAMZA_2, 'اِفْتِعَال'): lambda w, c1, c2, c3: S.replace(w, 'تأ', 'تئ'),
+    (HAMZA_2, 'اِسْتِفْعَال'): lambda w, c1, c2, c3: S.replace(w, 'تأ', 'تئ'),
+
+    (HAMZA_3, 'فَاعِل'): lambda w, c1, c2, c3: S.replace(w, c3, 'ئ'),
+    (HAMZA_3, 'مَفْعُول'): lambda w, c1, c2, c3: S.replace(S.replace(w, c3, 'ء'), 'ؤء', 'وء'),
+    (HAMZA_3, 'اِفْتِعَال'): _third_hamza_ifti3al,
+    (HAMZA_3, 'اِسْتِفْعَال'): _third_hamza_istif3al,
+    (HAMZA_3, 'فَعَلَ'): lambda w, c1, c2, c3: S.replace(w, c3, 'أ'),
+
+    (ASSIMILATED, 'اِفْتِعَال'): lambda w, c1, c2, c3: S.replace(w, S.add(c1, 'ت'), 'تّ'),
+    (ASSIMILATED, 'اِسْتِفْعَال'): lambda w, c1, c2, c3: S.replace(w, S.add(c1, 'ت'), 'تّ'),
+
+    (DEFECTIVE, 'فَاعِل'): lambda w, c1, c2, c3: S.replace(w, S.add(c3, 'ِ'), 'ٍ'),
+    (DEFECTIVE, 'مَفْعُول'): lambda w, c1, c2, c3: np.where(S.endswith(w, 'يّ'), w, S.add(w, 'يّ')),
+}
+
+
+def _as_strings(codes):
+    """Rows of a code-point matrix as a 1-D string array (trailing zeros dropped)."""
+    codes = np.ascontiguousarray(codes, dtype=np.uint32)
+    return codes.view(f'<U{codes.shape[1]}').reshape(len(codes))
+
+
+def _as_codes(words):
+    """A string array as an N x width code-point matrix, zero padded."""
+    words = np.ascontiguousarray(words)
+    return words.view(np.uint32).reshape(len(words), -1)
+
+
+def with_article(words):
+    """add_definite_article over a string array, on code points."""
+    codes = _as_codes(words)
+    first = codes[:, 0]
+    hamza = np.isin(first, _ARTICLE_HAMZAS)
+    sun = np.isin(first, _SUN_CODES) & ~hamza
+    out = np.zeros((len(codes), codes.shape[1] + 2), dtype=np.uint32)
+    out[:, 0] = np.where(sun, first, _ALEF)
+    out[:, 1] = np.where(sun, _SHADDA, _LAM)
+    # Hamza and sun letters replace (or double) the first letter: drop it
+    out[:, 2:] = codes
+    out[hamza | sun, 2:-1] = codes[hamza | sun, 1:]
+    out[hamza | sun, -1] = 0
+    return _as_strings(out)
+
+
+class VectorEngine:
+    """
+    Paradigm generator over a fixed set of roots, matching
+    MorphEngine._generate word for word (without memo or tracing).
+    """
+    def __init__(self, roots):
+        self.roots = list(roots)
+        # One spare column tells 3-letter roots from longer ones
+        codes = _as_codes(np.array(self.roots, dtype='<U4')) if self.roots \
+            else np.zeros((0, 4), dtype=np.uint32)
+        self.valid = (codes[:, 2] != 0) & (codes[:, 3] == 0)
+        self.codes = np.ascontiguousarray(codes[:, :3])
+        c1, c2, c3 = self.codes.T
+        # classify_root is non-empty exactly for these rows
+        weak = np.isin(self.codes, _IRREGULAR_CODES).any(axis=1)
+        self.irregular = self.valid & (weak | (c2 == c3))
+        # weakness classes -> row indices, and those rows' root letters
+        groups = {}
+        for i in np.flatnonzero(self.irregular).tolist():
+            groups.setdefault(MorphEngine.root_classes(self.roots[i]), []).append(i)
+        self.groups = {}
+        for classes, rows in groups.items():
+            rows = np.array(rows, dtype=np.intp)
+            letters = tuple(_as_strings(self.codes[rows, k:k + 1]) for k in range(3))
+            self.groups[classes] = (rows, letters)
+        self._templates = {}
+
+    def _template(self, pattern):
+        """Pattern -> (literal positions, literal codes, slot positions, slot columns)."""
+        template = self._templates.get(pattern)
+        if template is None:
+            literal = [(i, ord(ch)) for i, ch in enumerate(pattern) if ch not in _SLOTS]
+            slots = [(i, _SLOTS[ch]) for i, ch in enumerate(pattern) if ch in _SLOTS]
+            template = self._templates[pattern] = (
+                np.array([i for i, _ in literal], dtype=np.intp),
+                np.array([c for _, c in literal], dtype=np.uint32),
+                np.array([i for i, _ in slots], dtype=np.intp),
+                np.array([k for _, k in slots], dtype=np.intp),
+            )
+        return template
+
+    def fill(self, pattern):
+        """Template fill for every root at once: an N x len(pattern) code matrix."""
+        literal_at, literal_codes, slot_at, slot_columns = self._template(pattern)
+        out = np.empty((len(self.codes), len(pattern)), dtype=np.uint32)
+        out[:, literal_at] = literal_codes
+        out[:, slot_at] = self.codes[:, slot_columns]
+        return out
+
+    def generate(self, pattern, is_definite=False):
+        """apply_scheme(root, pattern, is_definite) for every root, as a string array."""
+        words = _as_strings(self.fill(pattern))
+        if self.groups:
+            rewritten = [(rows, self._rewrite(words[rows], classes, letters, pattern))
+                         for classes, (rows, letters) in self.groups.items()]
+            width = max([words.dtype.itemsize // 4] + [w.dtype.itemsize // 4 for _, w in rewritten])
+            words = words.astype(f'<U{width}')
+            for rows, group_words in rewritten:
+                words[rows] = group_words
+        if is_definite:
+            words = with_article(words)
+        if not self.valid.all():
+            words = np.where(self.valid, words, '')
+        return words
+
+    def _rewrite(self, words, classes, letters, pattern):
+        """One masked pass per rule of the (classes, pattern) plan, in MorphEngine order."""
+        for cls, rule, _ in MorphEngine._rule_plan(classes, pattern):
+            if rule is None:
+                continue
+            key = (cls, pattern) if (cls, pattern) in _RULES else (cls, None)
+            vector_rule = _VECTOR_RULES.get(key)
+            if vector_rule is not None:
+                words = vector_rule(words, *letters)
+            else:
+                words = np.array([rule(w, c1, c2, c3) for w, c1, c2, c3
+                                  in zip(words.tolist(), *(l.tolist() for l in letters))])
+        return words
+
+    def paradigm(self, schemes, definite=(False, True)):
+        """{(scheme name, is_definite): words aligned with self.roots} for a scheme list."""
+        return {(s['name'], is_def): self.generate(s['pattern'], is_def).tolist()
+                for s in schemes for is_def in definite}
+
+    def verify(self, schemes, definite=(False, True)):
+        """(root, pattern, is_definite, vector word, scalar word) for every disagreement."""
+        mismatches = []
+        for s in schemes:
+            for is_def in definite:
+                for root, word in zip(self.roots, self.generate(s['pattern'], is_def).tolist()):
+                    expected = MorphEngine._generate(root, s['pattern'], is_def)
+                    if word != expected:
+                        mismatches.append((root, s['pattern'], is_def, word, expected))
+        return mismatches
@@ -0,0 +1,353 @@
+"""
+Local JSON service over the morphology engine. The lexicon is loaded once;
+batched generate / validate / analyze requests are split into chunks that
+run on a process pool, so the event loop only parses and routes. Once
+--max-pending batches are in flight, new ones are refused with 503 and a
+Retry-After header instead of queueing without bound.
+
+    python serve.py --port 8765 --workers 4
+
+    POST /generate  {"items": [{"root": "كتب", "scheme": "اسم فاعل", "definite": false}]}
+    POST /validate  {"items": [{"word": "كَاتِب", "root": "كتب"}]}
+    POST /analyze   {"items": ["كَاتِب", "مَكْتُوب"]}
+    POST /roots     {"items": ["سمع"]}
+    GET  /health
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import sys
+
+from logic_bst import ArabicBST
+from logic_engine import MorphEngine
+from logic_hash import SchemeHashTable
+from logic_snapshot import load_snapshot
+from main import load_lexicon
+
+MAX_BODY_BYTES = 4 * 1024 * 1024
+MAX_BATCH_ITEMS = 5000
+# Roots added through POST /roots travel with every task until this many
+# have accumulated; then the workers are reloaded with the full root list
+RELOAD_AFTER = 256
+
+_STATUS_TEXT = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 503: 'Service Unavailable',
+}
+
+# Per-process lexicon, set by _init_worker. `_added` counts how many roots
+# added through POST /roots (since the last reload) it has already applied.
+_bst = None
+_schemes = None
+_ht = None
+_added = 0
+
+
+def _init_worker(roots, schemes, capacity=None):
+    global _bst, _schemes, _ht, _added
+    _bst = ArabicBST.from_sorted(roots, capacity=capacity)
+    _schemes = schemes
+    # validate() prunes candidate schemes through the table's signature index
+    _ht = SchemeHashTable()
+    for s in schemes:
+        _ht.insert(s['name'], s['pattern'])
+    _added = 0
+
+
+def _catch_up(added_roots):
+    """Apply roots added since the workers were (re)loaded (sent with every task)."""
+    global _added
+    for root in added_roots[_added:]:
+        _bst.insert(root)
+    _added = len(added_roots)
+
+
+def _scheme(item):
+    """The scheme an item names, by 'scheme' name or raw 'pattern'."""
+    if 'pattern' in item:
+        return {"name": item.get('scheme'), "pattern": item['pattern']}
+    for s in _schemes:
+        if s['name'] == item.get('scheme'):
+            return s
+    raise ValueError(f"unknown scheme: {item.get('scheme')!r}")
+
+
+def generate_batch(items, added_roots):
+    _catch_up(added_roots)
+    results = []
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({"error": "expected an object"})
+            continue
+        try:
+            s = _scheme(item)
+            word = MorphEngine.apply_scheme(item['root'], s['pattern'], bool(item.get('definite')))
+            results.append({"word": word, "scheme": s['name'], "pattern": s['pattern']})
+        except (KeyError, TypeError, ValueError) as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def validate_batch(items, added_roots):
+    _catch_up(added_roots)
+    results, pairs, slots = [], [], []
+    for item in items:
+        try:
+            word, root = item['word'], item['root']
+            if not isinstance(word, str) or not isinstance(root, str):
+                raise TypeError("word and root must be strings")
+            pairs.append((word, root))
+            slots.append(len(results))
+            results.append(None)
+        except (KeyError, TypeError) as e:
+            results.append({"error": str(e)})
+    # One paradigm per distinct root in the chunk
+    for slot, (is_valid, s) in zip(slots, MorphEngine.validate_many(pairs, _ht, _bst)):
+        results[slot] = {"valid": is_valid, "scheme": s}
+    return results
+
+
+def analyze_batch(items, added_roots):
+    _catch_up(added_roots)
+    results = []
+    for item in items:
+        word = item.get('word') if isinstance(item, dict) else item
+        if not isinstance(word, str):
+            results.append({"error": "expected a word"})
+            continue
+        results.append({"analyses": [{"root": root, "scheme": s['name']}
+                                     for root, s in MorphEngine.analyze(word, _schemes, _bst)]})
+    return results
+
+
+_BATCH_HANDLERS = {
+    '/generate': generate_batch,
+    '/validate': validate_batch,
+    '/analyze': analyze_batch,
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class MorphService:
+    """
+    Owns the authoritative lexicon (used for POST /roots and for caching
+    validated words) and the worker pool that answers batch requests.
+    """
+    def __init__(self, bst, ht, workers, chunk_size, max_pending, cache_capacity=None):
+        self.bst = bst
+        if cache_capacity is not None:
+            bst.set_capacity(cache_capacity)
+        self.schemes = ht.get_all()
+        self.workers = workers
+        self.cache_capacity = cache_capacity
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending
+        self.pending = 0
+        self.stats = {"requests": 0, "items": 0, "rejected": 0, "errors": 0, "reloads": 0}
+        self.pool = None
+        self._load_workers()
+
+    def _load_workers(self):
+        """(Re)load the lexicon in the workers, roots added so far included."""
+        initargs = (list(self.bst.roots()), self.schemes, self.cache_capacity)
+        previous = self.pool
+        if self.workers:
+            self.pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=initargs)
+        else:
+            _init_worker(*initargs)
+        self.added_roots = []
+        if previous is not None:
+            # Batches already submitted still finish on the old workers
+            previous.shutdown(wait=False)
+
+    async def run_batch(self, handler, items):
+        """Split `items` into chunks, run them on the pool, keep input order."""
+        added = tuple(self.added_roots)
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        if self.pool is None:
+            return [r for chunk in chunks for r in handler(chunk, added)]
+        loop = asyncio.get_running_loop()
+        parts = await asyncio.gather(*(loop.run_in_executor(self.pool, handler, chunk, added)
+                                       for chunk in chunks))
+        return [r for part in parts for r in part]
+
+    def add_roots(self, items):
+        results = []
+        for root in items:
+            if not isinstance(root, str) or len(root) != 3:
+                results.append({"error": "a root must be 3 letters"})
+                continue
+            is_new = self.bst.search(root) is None
+            if is_new:
+                self.bst.insert(root)
+                self.added_roots.append(root)
+            results.append({"root": root, "added": is_new})
+        if len(self.added_roots) >= RELOAD_AFTER:
+            self._load_workers()
+            self.stats["reloads"] += 1
+        return results
+
+    async def dispatch(self, method, path, body):
+        if path == '/health':
+            return {
+                "status": "ok",
+                "roots": self.bst.size,
+                "schemes": len(self.schemes),
+                "pending": self.pending,
+                "inverse_index": self.bst.inverse_index.stats(),
+                **self.stats,
+            }
+        if path not in _BATCH_HANDLERS and path != '/roots':
+            raise HTTPError(404, f"no such endpoint: {path}")
+        if method != 'POST':
+            raise HTTPError(405, "use POST")
+
+        try:
+            items = json.loads(body)["items"]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(400, 'body must be a JSON object with an "items" list')
+        if not isinstance(items, list):
+            raise HTTPError(400, '"items" must be a list')
+        if len(items) > MAX_BATCH_ITEMS:
+            raise HTTPError(413, f"at most {MAX_BATCH_ITEMS} items per batch")
+
+        self.stats["requests"] += 1
+        self.stats["items"] += len(items)
+        if path == '/roots':
+            return {"results": self.add_roots(items)}
+
+        # Backpressure: a bounded number of batches in flight, the rest are shed
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise HTTPError(503, "server busy, retry later", {"Retry-After": "1"})
+        self.pending += 1
+        try:
+            results = await self.run_batch(_BATCH_HANDLERS[path], items)
+        finally:
+            self.pending -= 1
+
+        if path == '/validate':
+            # Validated words go into the shared lexicon's inverse index too;
+            # roots it does not know yet go through add_roots first, so the
+            # workers learn them as well
+            valid = [(item, result) for item, result in zip(items, results) if result.get("valid")]
+            self.add_roots(list(dict.fromkeys(item['root'] for item, _ in valid
+                                              if self.bst.search(item['root']) is None)))
+            for item, result in valid:
+                if self.bst.search(item['root']) is not None:
+                    self.bst.insert(item['root'], [{"word": item['word'], "pattern": result["scheme"]['name']}],
+                                    cached=True)
+        return {"results": results}
+
+    async def handle(self, reader, writer):
+        """One connection: HTTP/1.1 requests until the client closes or asks to."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, close=True)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                close = headers.get('connection', '').lower() == 'close'
+                length = headers.get('content-length') or '0'
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(writer, 400, {"error": "invalid Content-Length"}, close=True)
+                    break
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    payload, status, extra = await self.dispatch(method, target.split('?', 1)[0], body), 200, {}
+                except HTTPError as e:
+                    payload, status, extra = {"error": str(e)}, e.status, e.headers
+                except Exception as e:  # keep serving; report the failure to this caller only
+                    self.stats["errors"] += 1
+                    payload, status, extra = {"error": f"{type(e).__name__}: {e}"}, 500, {}
+                await self._respond(writer, status, payload, extra, close)
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, headers=None, close=False):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = [
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, 'Internal Server Error')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'close' if close else 'keep-alive'}",
+        ]
+        head.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Listening on http://{host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the morphology engine as a local JSON API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--roots', default='racines.txt', help="roots file, one root per line")
+    parser.add_argument('--snapshot', help="load roots and schemes from a lexicon snapshot instead")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help="worker processes (0 runs batches in the server process)")
+    parser.add_argument('--chunk-size', type=int, default=100, help="items per worker task")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="batches in flight before answering 503 (default: 4 per worker)")
+    parser.add_argument('--cache-capacity', type=int, default=None,
+                        help="validated words kept in the inverse index, least recently used evicted "
+                             "first (default: unbounded; lexicon entries are never evicted)")
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        bst, ht = load_snapshot(args.snapshot)
+    else:
+        bst, ht = load_lexicon(args.roots)
+    service = MorphService(bst, ht, args.workers, args.chunk_size,
+                           args.max_pending or max(4 * args.workers, 1), args.cache_capacity)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback, useMemo } from 'react';
+import React, { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import TreeVisualizer from './components/TreeVisualizer';
 import SchemeManager from './components/SchemeManager';
 import Toast from './components/Toast';
@@ -8,7 +8,6 @@ const App: React.FC = () => {
   const [isLoaded, setIsLoaded] = useState(false);
   const [activeView, setActiveView] = useState('GENERATOR');
   const [bstData, setBstData] = useState<any>(null);
-  const [schemes, setSchemes] = useState<any[]>([]);
   const [selectedRoot, setSelectedRoot] = useState<string>('كتب');
   const [isDefinite, setIsDefinite] = useState(false);
   const [allRoots, setAllRoots] = useState<string[]>([]);
@@ -19,6 +18,10 @@ const App: React.FC = () => {
   const [valRoot, setValRoot] = useState('');
   const [valResult, setValResult] = useState<any>(null);
   const [hashStructure, setHashStructure] = useState<any[][]>([]);
+  // get_all() order is bucket order, so the flat scheme list follows the buckets
+  const schemes = useMemo(() => hashStructure.flat(), [hashStructure]);
+  // Python-side versions of bst / ht already reflected in the UI state
+  const syncedVersions = useRef({ bst: 0, ht: 0 });
   const [schemesRefresh, setSchemesRefresh] = useState(0);
   const [toast, setToast] = useState<{message: string, type: 'success' | 'error' | 'info'} | null>(null);
 
@@ -78,7 +81,11 @@ const App: React.FC = () => {
         indexURL: "https://cdn.jsdelivr.net/pyodide/v0.23.4/full/"
       });
 
-      // Load Python code from .py files in public folder
+      // Load Python code from .py files in public folder.
+      // Shared helper modules are imported by the others, so they go on the virtual FS
+      for (const module of ['logic_metrics.py', 'logic_symbols.py', 'logic_dawg.py', 'logic_normalize.py']) {
+        py.FS.writeFile(module, await fetch(`/${module}`).then(r => r.text()));
+      }
       const bstCode = await fetch('/logic_bst.py').then(r => r.text());
       const hashCode = await fetch('/logic_hash.py').then(r => r.text());
       const engineCode = await fetch('/logic_engine.py').then(r => r.text());
@@ -134,6 +141,11 @@ const App: React.FC = () => {
         await py.runPythonAsync(`ht.insert("${name}", "${pattern}")`);
       }
 
+      // Materialize every root × scheme form once; kept in sync on inserts
+      await py.runPythonAsync(`paradigms = ParadigmIndex().attach(bst, ht)`);
+      // Derivation memo drops a pattern's entries when that scheme is edited
+      await py.runPythonAsync(`engine.derivations.attach(ht)`);
+
       setPyodide(py);
       setIsLoaded(true);
       await syncData(py);
@@ -148,12 +160,12 @@ const App: React.FC = () => {
     const py = pyInstance || pyodide;
     try {
       const bstJson = await py.runPython(`json.dumps(bst.to_dict())`);
-      const schemesJson = await py.runPython(`json.dumps(ht.get_all())`);
       const hashJson = await py.runPython(`json.dumps(ht.get_full_structure())`);
+      const versionsJson = await py.runPython(`json.dumps({"bst": bst.version, "ht": ht.version})`);
       
       setBstData(JSON.parse(bstJson));
-      setSchemes(JSON.parse(schemesJson));
       setHashStructure(JSON.parse(hashJson));
+      syncedVersions.current = JSON.parse(versionsJson);
       
       // Update roots list from BST
       const roots: string[] = [];
@@ -175,9 +187,89 @@ const App: React.FC = () => {
     }
   };
 
+  // Incremental sync: apply only what changed since the last sync (O(change))
+  const syncChanges = async (pyInstance: any) => {
+    const py = pyInstance || pyodide;
+    try {
+      const { bst: bstVersion, ht: htVersion } = syncedVersions.current;
+      const delta = JSON.parse(await py.runPython(`changes_since(bst, ht, ${bstVersion}, ${htVersion})`));
+      if (delta.bst.full || delta.schemes.full) {
+        await syncData(py);
+        return;
+      }
+      syncedVersions.current = { bst: delta.bst.version, ht: delta.schemes.version };
+
+      const newDerivatives: [string, string, string][] = delta.bst.derivatives;
+      const removedDerivatives: [string, string][] = delta.bst.removed;
+      if (delta.bst.shape || newDerivatives.length > 0 || removedDerivatives.length > 0) {
+        setBstData((prev: any) => {
+          // Rotations may move nodes: rebuild from the shape, reusing derivatives
+          if (delta.bst.shape) {
+            const derivativesByRoot: Record<string, any[]> = {};
+            const collect = (node: any) => {
+              if (!node) return;
+              derivativesByRoot[node.root] = node.derivatives;
+              collect(node.left);
+              collect(node.right);
+            };
+            collect(prev);
+            const build = (shape: any): any => shape && {
+              root: shape[0],
+              derivatives: derivativesByRoot[shape[0]] || [],
+              left: build(shape[1]),
+              right: build(shape[2])
+            };
+            prev = build(delta.bst.shape);
+          }
+          // Path-copy down to each touched node so React sees new objects
+          const updateNode = (node: any, root: string, update: (derivatives: any[]) => any[]): any => {
+            if (!node) return node;
+            if (root === node.root) return { ...node, derivatives: update(node.derivatives) };
+            return root < node.root
+              ? { ...node, left: updateNode(node.left, root, update) }
+              : { ...node, right: updateNode(node.right, root, update) };
+          };
+          // Evicted cache entries go first: a word may be re-added in the same delta
+          for (const [root, word] of removedDerivatives) {
+            prev = updateNode(prev, root, ds => ds.filter((d: any) => d.word !== word));
+          }
+          for (const [root, word, pattern] of newDerivatives) {
+            prev = updateNode(prev, root, ds => [...ds, { word, pattern }]);
+          }
+          return prev;
+        });
+      }
+
+      if (delta.bst.roots.length > 0) {
+        setAllRoots(prev => [...prev, ...delta.bst.roots].sort());
+      }
+
+      const edits: [string, string, string, number][] = delta.schemes.edits;
+      if (edits.length > 0) {
+        setHashStructure(prev => {
+          const next = prev.map(bucket => [...bucket]);
+          for (const [op, name, pattern, bucket] of edits) {
+            const index = next[bucket].findIndex((item: any) => item.name === name);
+            if (op === 'remove') {
+              if (index >= 0) next[bucket].splice(index, 1);
+            } else if (index >= 0) {
+              next[bucket][index] = { name, pattern };
+            } else {
+              next[bucket].push({ name, pattern });
+            }
+          }
+          return next;
+        });
+      }
+    } catch (error) {
+      console.error("Sync error:", error);
+      showToast("خطأ في مزامنة البيانات", "error");
+    }
+  };
+
   const handleSchemesUpdated = () => {
     setSchemesRefresh(prev => prev + 1);
-    syncData(pyodide);
+    syncChanges(pyodide);
   };
 
   useEffect(() => {
@@ -208,7 +300,7 @@ const App: React.FC = () => {
         await pyodide.runPython(`bst.insert("${root}")`);
         
         input.value = '';
-        await syncData(pyodide);
+        await syncChanges(pyodide);
         
         showToast(`تم إضافة الجذر "${root}" بنجاح`, 'success');
       } catch (error) {
@@ -233,10 +325,10 @@ const App: React.FC = () => {
       
       // Add the generated word to BST derivatives
       await pyodide.runPython(`
-        bst.insert("${selectedRoot}", [{"word": "${result}", "pattern": "${schemeName}"}])
+        bst.insert("${selectedRoot}", [{"word": "${result}", "pattern": "${schemeName}"}], cached=True)
       `);
       
-      await syncData(pyodide);
+      await syncChanges(pyodide);
       showToast(`تم توليد الكلمة "${result}" بنجاح`, 'success');
     } catch (error) {
       console.error('Error generating word:', error);
@@ -259,8 +351,7 @@ const App: React.FC = () => {
     console.log("Available schemes:", allSchemes);
     
     const res = await pyodide.runPython(`
-      schemes = ${JSON.stringify(allSchemes)}
-      result = engine.validate("${valWord}", "${valRoot}", schemes, bst)
+      result = engine.validate("${valWord}", "${valRoot}", ht, bst, paradigms)
       json.dumps({"isValid": result[0], "scheme": result[1]})
     `);
     
@@ -268,7 +359,7 @@ const App: React.FC = () => {
     setValResult(parsed);
     
     if (parsed.isValid) {
-      await syncData(pyodide);
+      await syncChanges(pyodide);
       showToast(`الكلمة "${valWord}" تنتمي للجذر "${valRoot}"`, 'success');
     } else {
       showToast(`الكلمة "${valWord}" لا تنتمي للجذر "${valRoot}"`, 'error');
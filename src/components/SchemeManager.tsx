@@ -81,20 +81,7 @@ const SchemeManager: React.FC<SchemeManagerProps> = ({ pyodide, onSchemesUpdated
     
     const { name } = showDeleteConfirm;
     try {
-      // Method 1: Direct Python approach
-      await pyodide.runPython(`
-        # Get current schemes
-        all_schemes = ht.get_all()
-        
-        # Remove the scheme by rebuilding the hash table
-        ht_new = SchemeHashTable()
-        for s in all_schemes:
-            if s['name'] != "${name}":
-                ht_new.insert(s['name'], s['pattern'])
-        
-        # Replace the old table
-        ht.table = ht_new.table
-      `);
+      await pyodide.runPython(`ht.remove("${name}")`);
       
       await loadSchemes();
       onSchemesUpdated();
@@ -128,20 +115,7 @@ const SchemeManager: React.FC<SchemeManagerProps> = ({ pyodide, onSchemesUpdated
     }
     
     try {
-      await pyodide.runPython(`
-        # Remove old scheme
-        all_schemes = ht.get_all()
-        ht_new = SchemeHashTable()
-        for s in all_schemes:
-            if s['name'] != "${oldScheme.name}":
-                ht_new.insert(s['name'], s['pattern'])
-        
-        # Add updated scheme
-        ht_new.insert("${editName}", "${editPattern}")
-        
-        # Replace table
-        ht.table = ht_new.table
-      `);
+      await pyodide.runPython(`ht.update("${oldScheme.name}", "${editName}", "${editPattern}")`);
       
       setEditingIndex(null);
       await loadSchemes();